@@ -194,7 +194,8 @@ run_tests() {
     if [[ -n ${DEBUG+0} ]]; then
         printf "\e[31;1m[?]\e[0m Running coverage tests\n"
     fi
-    coverage run --source="$gambit_dir" "$gambit_dir"/manage.py test gambit
+    # Benchmarks are run separately, see gambit/tests/test_benchmarks.py
+    coverage run --source="$gambit_dir" "$gambit_dir"/manage.py test gambit --exclude-tag benchmark
 }
 
 main() {
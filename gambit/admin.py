@@ -1,12 +1,19 @@
 import csv
 
 from django.urls import reverse
+from django.conf import settings
 from django.contrib import admin
-from django.http import HttpResponse
+from django.utils import timezone
+from django.http import StreamingHttpResponse
 from django.template import defaultfilters
+from django.template.response import TemplateResponse
+from django.contrib.admin import helpers
 from django.contrib.auth.models import User
 from django.utils.safestring import mark_safe
 
+from . import notifications
+from .content import get_managed_content
+from .archive import submission_archive_response
 from .models import (
     Profile,
     Submission,
@@ -14,10 +21,69 @@ from .models import (
     FrontPage,
     SubmissionDeadline,
     RegistrationStatus,
-    HelpPageItem
+    HelpPageItem,
+    Job,
+    OutboxMessage,
+    DecisionNotification,
 )
 
 
+# Rows fetched per round trip from the server-side cursor while streaming an export
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() returns its input, so that csv.writer produces each row for streaming"""
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, header, rows):
+    """Stream rows as a CSV attachment without holding the file or the rows in memory"""
+    writer = csv.writer(Echo())
+    def generate():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+    response = StreamingHttpResponse(generate(), content_type="text/csv")
+    response["Content-Disposition"] = f"attachment; filename={filename!s}"
+    return response
+
+
+def format_timestamp(value):
+    # Formatted in Python rather than with to_char() so exports do not depend on the database; UTC as before
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class CycleListFilter(admin.SimpleListFilter):
+    """Filters by CFP cycle, showing only the active cycle unless another is chosen"""
+    title = "CFP"
+    parameter_name = "cycle"
+
+    def lookups(self, request, model_admin):
+        cycles = model_admin.model.objects.order_by("-cycle").values_list("cycle", flat=True).distinct()
+        return [("all", "All")] + [(str(cycle), str(cycle)) for cycle in cycles if cycle is not None]
+
+    def value(self):
+        return super(CycleListFilter, self).value() or str(settings.CONFERENCE_YEAR)
+
+    def choices(self, changelist):
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}, []),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        if self.value() == "all":
+            return queryset
+        try:
+            return queryset.filter(cycle=int(self.value()))
+        except ValueError:
+            return queryset.none()
+
+
 class ProfileAdmin(admin.ModelAdmin):
     list_display = (
         'name',
@@ -48,15 +114,23 @@ class SubmissionAdmin(admin.ModelAdmin):
     list_display = (
         'title',
         '_username',
+        'cycle',
     )
     list_filter = (
+        CycleListFilter,
         'submitted_on',
     )
+    # Aggregates are maintained from the reviews, so saving the submission never writes them
     readonly_fields = (
         'file_hash',
         '_timestamp',
+        'review_count',
+        'total_score',
+        'average_score',
+        'total_expertise_score',
+        'average_expertise_score',
     )
-    actions = ['_export_to_csv']
+    actions = ['_export_to_csv', '_download_files', '_notify_accepted', '_notify_rejected']
     list_select_related = ('user',)
     list_per_page = 25
     search_fields = (
@@ -86,10 +160,7 @@ class SubmissionAdmin(admin.ModelAdmin):
     _timestamp.short_description = "Submitted on"
 
     def _export_to_csv(self, request, queryset):
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = "attachment; filename=44CON-CFP-submissions.csv"
-        writer = csv.writer(response)
-        writer.writerow([
+        header = [
             'Name',
             'Authors',
             'Account Email',
@@ -102,29 +173,57 @@ class SubmissionAdmin(admin.ModelAdmin):
             'Cumulative Score',
             'Number of votes',
             'Submitted On',
-        ])
-        submissions = queryset.extra(
-            select={
-                'submitted_on_normalised': "to_char(submitted_on, 'YYYY-MM-DD HH24:MI:SS')"
-            }).values_list(
-                'user__profile__name',
-                'authors',
-                'user__email',
-                'contact_email',
-                'user__profile__country',
-                'title',                
-                'average_expertise_score',
-                'average_score',
-                'total_expertise_score',
-                'total_score',
-                'review_count',
-                'submitted_on_normalised',
-            )
-        for submission in submissions:
-            writer.writerow(submission)
-        return response
+        ]
+        submissions = queryset.values_list(
+            'user__profile__name',
+            'authors',
+            'user__email',
+            'contact_email',
+            'user__profile__country',
+            'title',
+            'average_expertise_score',
+            'average_score',
+            'total_expertise_score',
+            'total_score',
+            'review_count',
+            'submitted_on',
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        rows = (submission[:-1] + (format_timestamp(submission[-1]),) for submission in submissions)
+        return stream_csv("44CON-CFP-submissions.csv", header, rows)
     _export_to_csv.short_description = "Export to CSV"
 
+    def _download_files(self, request, queryset):
+        return submission_archive_response(queryset)
+    _download_files.short_description = "Download files as ZIP"
+
+    def _notify_decision(self, request, queryset, decision):
+        # Emails every selected speaker, so asks for confirmation first like the delete action
+        if request.POST.get("confirm") == decision:
+            queued = notifications.queue_decision_notifications(queryset, decision)
+            self.message_user(request, (
+                f"Queued {queued!s} notifications, which are being sent in the background. Submissions which had "
+                f"already been notified of this decision were skipped."
+            ))
+            return None
+        context = dict(
+            self.admin_site.each_context(request),
+            title=f"Notify speakers that their submissions were {decision!s}",
+            decision=decision,
+            submissions=queryset.select_related("user"),
+            action=request.POST["action"],
+            action_checkbox_name=helpers.ACTION_CHECKBOX_NAME,
+            opts=self.model._meta,
+        )
+        return TemplateResponse(request, "admin/gambit/submission/notify_decision.html", context)
+
+    def _notify_accepted(self, request, queryset):
+        return self._notify_decision(request, queryset, DecisionNotification.ACCEPTED)
+    _notify_accepted.short_description = "Notify speakers of acceptance"
+
+    def _notify_rejected(self, request, queryset):
+        return self._notify_decision(request, queryset, DecisionNotification.REJECTED)
+    _notify_rejected.short_description = "Notify speakers of rejection"
+
 
 admin.site.register(Submission, SubmissionAdmin)
 
@@ -136,6 +235,7 @@ class SubmissionReviewAdmin(admin.ModelAdmin):
         'submitted_on',
     )
     list_filter = (
+        CycleListFilter,
         'submitted_on',
     )
     actions = ['_export_to_csv']
@@ -167,22 +267,17 @@ class SubmissionReviewAdmin(admin.ModelAdmin):
     _reviewer.admin_order_field = "user__username"  # Allows this field to be sortable
 
     def _export_to_csv(self, request, queryset):
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = "attachment; filename=44CON-CFP-review-comments.csv"
-        writer = csv.writer(response)
-        writer.writerow([
+        header = [
             'Reviewer',
             'Comments',
             'Submission Title',
-        ])
+        ]
         reviews = queryset.values_list(
             'user__profile__name',
             'comments',
             'submission__title',
-        )
-        for review in reviews:
-            writer.writerow(review)
-        return response
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return stream_csv("44CON-CFP-review-comments.csv", header, reviews)
     _export_to_csv.short_description = "Export to CSV"
 
 
@@ -198,7 +293,7 @@ class FrontPageAdmin(admin.ModelAdmin):
     # Can be overridden from the Django shell
     def has_add_permission(self, *args, **kwargs):
         # Return value must be false to block additional objects
-        does_front_page_object_exist = FrontPage.objects.exists()
+        does_front_page_object_exist = get_managed_content(FrontPage) is not None
         return not does_front_page_object_exist 
 
 
@@ -213,7 +308,7 @@ class SubmissionDeadlineAdmin(admin.ModelAdmin):
     # Can be overridden from the Django shell
     def has_add_permission(self, *args, **kwargs):
         # Return value must be false to block additional objects
-        does_submission_deadline_exist = SubmissionDeadline.objects.exists()
+        does_submission_deadline_exist = get_managed_content(SubmissionDeadline) is not None
         return not does_submission_deadline_exist
 
 
@@ -228,7 +323,7 @@ class RegistrationStatusAdmin(admin.ModelAdmin):
     # Can be overridden from the Django shell
     def has_add_permission(self, *args, **kwargs):
         # Return value must be false to block additional objects
-        does_registration_status_exist = RegistrationStatus.objects.exists()
+        does_registration_status_exist = get_managed_content(RegistrationStatus) is not None
         return not does_registration_status_exist
 
 
@@ -242,3 +337,105 @@ class HelpPageItemAdmin(admin.ModelAdmin):
 
 
 admin.site.register(HelpPageItem, HelpPageItemAdmin)
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'task',
+        'status',
+        'attempts',
+        'run_after',
+        'finished_on',
+    )
+    list_filter = (
+        'status',
+        'task',
+    )
+    readonly_fields = (
+        'created_on',
+        'finished_on',
+        'last_error',
+    )
+    actions = ['_retry']
+    ordering = ["-run_after"]
+    list_per_page = 25
+
+    def _retry(self, request, queryset):
+        retried = queryset.exclude(status=Job.DONE).update(status=Job.QUEUED, attempts=0, run_after=timezone.now())
+        self.message_user(request, f"Queued {retried!s} jobs to run again")
+    _retry.short_description = "Retry now"
+
+
+admin.site.register(Job, JobAdmin)
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        'subject',
+        'recipients',
+        'status',
+        'attempts',
+        'send_after',
+        'sent_on',
+    )
+    list_filter = (
+        'status',
+    )
+    search_fields = (
+        'subject',
+    )
+    readonly_fields = (
+        'message',
+        'created_on',
+        'sent_on',
+        'last_error',
+    )
+    actions = ['_retry']
+    ordering = ["-send_after"]
+    list_per_page = 25
+
+    def _retry(self, request, queryset):
+        retried = queryset.exclude(status=OutboxMessage.SENT).update(
+            status=OutboxMessage.QUEUED,
+            attempts=0,
+            send_after=timezone.now(),
+        )
+        self.message_user(request, f"Queued {retried!s} messages to send again")
+    _retry.short_description = "Retry now"
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
+
+
+class DecisionNotificationAdmin(admin.ModelAdmin):
+    list_display = (
+        'submission',
+        'decision',
+        'status',
+        '_delivery',
+        'queued_on',
+    )
+    list_filter = (
+        'decision',
+        'status',
+        'message__status',
+    )
+    readonly_fields = (
+        'submission',
+        'decision',
+        'message',
+        'created_on',
+        'queued_on',
+        'error',
+    )
+    list_select_related = ('submission', 'message')
+    ordering = ["-created_on"]
+    list_per_page = 25
+
+    def _delivery(self, obj):
+        return obj.message.get_status_display() if obj.message else "-"
+    _delivery.short_description = "Delivery"
+    _delivery.admin_order_field = "message__status"
+
+
+admin.site.register(DecisionNotification, DecisionNotificationAdmin)
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_migrate, post_migrate
 
 
 class GambitConfig(AppConfig):
     name = "gambit"
     verbose_name = "Gambit"
+
+    def ready(self):
+        # Importing roles and content registers their cache invalidation receivers, and search its index maintenance
+        from . import ranking, database, roles, content, search
+        pre_migrate.connect(ranking.drop_view, sender=self, dispatch_uid="drop_submission_ranking_view")
+        pre_migrate.connect(database.deduplicate_reviews, sender=self, dispatch_uid="deduplicate_reviews")
+        post_migrate.connect(database.reconcile_deduplicated_reviews, sender=self, dispatch_uid="reconcile_reviews")
+        post_migrate.connect(database.backfill_cycles, sender=self, dispatch_uid="backfill_cycles")
+        post_migrate.connect(ranking.create_view, sender=self, dispatch_uid="create_submission_ranking_view")
+        post_migrate.connect(search.create_search_configuration, sender=self, dispatch_uid="create_search_configuration")
@@ -0,0 +1,99 @@
+import io
+import os
+import csv
+import zipfile
+
+from django.utils import timezone
+from django.http import StreamingHttpResponse
+from django.utils.text import slugify
+
+
+# Formats which are already compressed gain nothing from deflating again, so are stored as they are
+STORED_EXTENSIONS = {".pdf", ".docx", ".pptx", ".xlsx", ".odt", ".odp", ".zip", ".gz", ".png", ".jpg", ".jpeg"}
+
+MANIFEST_NAME = "manifest.csv"
+
+
+class ZipStream:
+    """Unseekable file-like object which collects what zipfile writes to it until it is taken for streaming
+
+    zipfile writes a data descriptor after each entry when it cannot seek back, so an archive can be built in a single
+    pass while only one chunk of one file is ever held in memory.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def write(self, data):
+        self.buffer.extend(data)
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def archive_path(submission):
+    # Prefixed with part of the UUID so that submissions with the same title do not collide
+    directory = f"{slugify(submission.title)[:60]!s}-{str(submission.uuid)[:8]!s}"
+    return f"{directory!s}/{submission.get_file_name()!s}"
+
+
+def zip_info(path, size, date_time):
+    info = zipfile.ZipInfo(path, date_time=date_time)
+    _, extension = os.path.splitext(path)
+    info.compress_type = zipfile.ZIP_STORED if extension.lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+    # Lets zipfile decide up front whether the entry needs ZIP64 sizes
+    info.file_size = size
+    info.external_attr = 0o644 << 16
+    return info
+
+
+def stream_submission_archive(submissions):
+    """Yield a ZIP of the files of submissions as it is built, followed by a manifest of what it contains"""
+    stream = ZipStream()
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(["Path", "Title", "Author", "File Hash", "Submitted On"])
+    with zipfile.ZipFile(stream, "w") as archive:
+        for submission in submissions:
+            if not submission.file:
+                continue
+            path = archive_path(submission)
+            try:
+                source = submission.file.storage.open(submission.file.name, "rb")
+            except OSError:
+                # Recorded in the manifest rather than failing an archive which is already partly sent
+                path = f"(missing) {path!s}"
+            else:
+                submitted_on = timezone.localtime(submission.submitted_on)
+                with source, archive.open(zip_info(path, source.size, submitted_on.timetuple()[:6]), "w") as entry:
+                    for chunk in source.chunks():
+                        entry.write(chunk)
+                        yield stream.take()
+            writer.writerow([
+                path,
+                submission.title,
+                submission.user.profile.name,
+                submission.file_hash,
+                submission.submitted_on.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            ])
+            yield stream.take()
+        archive.writestr(MANIFEST_NAME, manifest.getvalue(), compress_type=zipfile.ZIP_DEFLATED)
+    yield stream.take()
+
+
+def submission_archive_response(queryset, filename="44CON-CFP-submissions.zip"):
+    submissions = queryset.exclude(file="").select_related("user__profile").order_by("submitted_on")
+    response = StreamingHttpResponse(stream_submission_archive(submissions.iterator()), content_type="application/zip")
+    response["Content-Disposition"] = f"attachment; filename={filename!s}"
+    return response
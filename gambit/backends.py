@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+UserModel = get_user_model()
+
+
+class AccountBackend(ModelBackend):
+    """ModelBackend which can also authenticate inactive accounts, for gambit.forms.LoginForm
+
+    The login form tells the owner of an inactive account to activate it, but only once they have given its password.
+    Passing allow_inactive returns such accounts from the one password check, so the form never checks a password
+    twice. Sessions of inactive users are still rejected by get_user().
+    """
+
+    def authenticate(self, request, username=None, password=None, allow_inactive=False, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash the password anyway so that unknown usernames take as long as wrong passwords
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and (allow_inactive or self.user_can_authenticate(user)):
+            return user
+        return None
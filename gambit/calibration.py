@@ -0,0 +1,82 @@
+import numpy as np
+from django.db import transaction
+
+from .models import SubmissionReview, CalibratedScore
+
+
+def calibrate(submission_codes, reviewer_codes, scores, expertise):
+    """Normalise each reviewer's scores and combine them per submission, weighted by expertise
+
+    Takes one array entry per review: dense integer codes for the submission and reviewer, plus the review's
+    submission and expertise scores. Every review is converted to a z-score against its reviewer's own mean and
+    standard deviation, so a reviewer who only ever gives 1s or 5s carries no more weight than one who uses the whole
+    scale. Reviewers without any spread in their scores contribute a z-score of 0.
+
+    Returns the expertise-weighted mean z-score of each submission, and that z-score mapped back onto the 1-5 scale
+    using the mean and standard deviation of every score in the CFP. Both are indexed by submission code.
+    """
+    scores = scores.astype(np.float64)
+    reviewer_count = np.bincount(reviewer_codes)
+    reviewer_mean = np.bincount(reviewer_codes, weights=scores) / reviewer_count
+    reviewer_variance = np.bincount(reviewer_codes, weights=scores * scores) / reviewer_count - reviewer_mean ** 2
+    reviewer_std = np.sqrt(np.clip(reviewer_variance, 0, None))
+
+    deviation = scores - reviewer_mean[reviewer_codes]
+    std = reviewer_std[reviewer_codes]
+    z_scores = np.divide(deviation, std, out=np.zeros_like(deviation), where=std > 1e-9)
+
+    weights = expertise.astype(np.float64)
+    weight_total = np.bincount(submission_codes, weights=weights)
+    weighted_z = np.bincount(submission_codes, weights=z_scores * weights)
+    z_score = np.divide(weighted_z, weight_total, out=np.zeros_like(weighted_z), where=weight_total > 0)
+    calibrated_score = scores.mean() + z_score * scores.std()
+    return z_score, calibrated_score
+
+
+def factorize(values):
+    """Return dense int32 codes for values and the distinct values in code order"""
+    index = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int32, count=len(values))
+    return codes, list(index)
+
+
+def calibrate_reviews(year):
+    """Calibrate every review of the CFP cycle for year and replace its stored CalibratedScore rows
+
+    Returns the number of submissions calibrated.
+    """
+    # A single query for the whole reviewer x submission matrix, stored as compact per-review columns
+    reviews = list(SubmissionReview.objects.filter(cycle=year).order_by().values_list(
+        'submission_id',
+        'user_id',
+        'submission_score',
+        'expertise_score',
+    ))
+    submission_ids, user_ids, scores, expertise = zip(*reviews) if reviews else ((), (), (), ())
+    submission_codes, submissions = factorize(submission_ids)
+    reviewer_codes, _ = factorize(user_ids)
+
+    calibrated = []
+    if submissions:
+        z_scores, calibrated_scores = calibrate(
+            submission_codes,
+            reviewer_codes,
+            np.array(scores, dtype=np.int8),
+            np.array(expertise, dtype=np.int8),
+        )
+        review_counts = np.bincount(submission_codes)
+        calibrated = [
+            CalibratedScore(
+                submission_id=submission_id,
+                year=year,
+                review_count=int(review_counts[code]),
+                z_score=float(z_scores[code]),
+                calibrated_score=float(calibrated_scores[code]),
+            )
+            for code, submission_id in enumerate(submissions)
+        ]
+
+    with transaction.atomic():
+        CalibratedScore.objects.filter(year=year).delete()
+        CalibratedScore.objects.bulk_create(calibrated, batch_size=1000)
+    return len(calibrated)
@@ -0,0 +1,74 @@
+import time
+import threading
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+
+from .models import ManagedContent
+
+
+# Process-wide cache of managed content, keyed by model. Each entry is (expires, value).
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _load(model, many):
+    key = (model, many)
+    # Transactions can see their own uncommitted changes, which must neither be cached nor hidden by the cache
+    if connection.in_atomic_block:
+        return None, key
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1], key
+    return None, key
+
+
+def _store(key, value):
+    if connection.in_atomic_block:
+        return
+    with _cache_lock:
+        _cache[key] = (time.monotonic() + settings.MANAGED_CONTENT_CACHE_TIMEOUT, value)
+
+
+def get_managed_content(model):
+    """Return the single object of a ManagedContent model such as SubmissionDeadline, or None if it does not exist"""
+    cached, key = _load(model, False)
+    if cached is not None:
+        return cached[0]
+    content = model.objects.first()
+    # Wrapped in a tuple so that a missing object is cached too
+    _store(key, (content,))
+    return content
+
+
+def get_managed_content_list(model):
+    """Return every object of a ManagedContent model such as HelpPageItem"""
+    cached, key = _load(model, True)
+    if cached is not None:
+        return list(cached)
+    content = tuple(model.objects.all())
+    _store(key, content)
+    return list(content)
+
+
+def clear_managed_content(model=None):
+    with _cache_lock:
+        if model is None:
+            _cache.clear()
+        else:
+            _cache.pop((model, False), None)
+            _cache.pop((model, True), None)
+
+
+@receiver(post_save, dispatch_uid="invalidate_managed_content_save")
+@receiver(post_delete, dispatch_uid="invalidate_managed_content_delete")
+def invalidate_managed_content(sender, **kwargs):
+    if not issubclass(sender, ManagedContent):
+        return
+    clear_managed_content(sender)
+    # Cleared again once committed, as another request may have cached the old content before the change was visible.
+    # Other processes pick up the change once MANAGED_CONTENT_CACHE_TIMEOUT has passed.
+    transaction.on_commit(lambda: clear_managed_content(sender))
@@ -1,12 +1,13 @@
 from django.conf import settings
 
 from .models import SubmissionDeadline
+from .content import get_managed_content
 
 
 # Globally-accessible custom variables
 # These all require matching declarations in settings.py
 def global_settings(request):
-    deadline = SubmissionDeadline.objects.first()
+    deadline = get_managed_content(SubmissionDeadline)
     try:
         release_hash = settings.RAVEN_CONFIG['release']
     except AttributeError:
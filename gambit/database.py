@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+
+
+# Keeps the most recent review when a reviewer has reviewed the same submission more than once
+DEDUPLICATE_REVIEWS_SQL = """
+DELETE FROM gambit_submissionreview AS review
+USING gambit_submissionreview AS newer
+WHERE review.submission_id = newer.submission_id
+    AND review.user_id = newer.user_id
+    AND (review.submitted_on, review.uuid) < (newer.submitted_on, newer.uuid)
+"""
+
+# Submissions made before cycles were recorded belong to the CFP of the year they were submitted in, and reviews to the
+# cycle of their submission
+BACKFILL_CYCLES_SQL = (
+    """
+    UPDATE gambit_submission
+    SET cycle = CAST(date_part('year', submitted_on AT TIME ZONE %(time_zone)s) AS integer)
+    WHERE cycle IS NULL
+    """,
+    """
+    UPDATE gambit_submissionreview AS review
+    SET cycle = submission.cycle
+    FROM gambit_submission AS submission
+    WHERE review.submission_id = submission.uuid AND review.cycle IS NULL
+    """,
+)
+
+# Set when duplicate reviews were deleted, so that submission aggregates are recomputed once migrations complete
+_reviews_deduplicated = False
+
+
+def deduplicate_reviews(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Remove duplicate reviews before the unique (submission, user) constraint is migrated; connected to pre_migrate"""
+    global _reviews_deduplicated
+    connection = connections[using]
+    if "gambit_submissionreview" not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(DEDUPLICATE_REVIEWS_SQL)
+        _reviews_deduplicated = _reviews_deduplicated or cursor.rowcount > 0
+
+
+def reconcile_deduplicated_reviews(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Recompute the review aggregates of every submission if reviews were deleted; connected to post_migrate"""
+    global _reviews_deduplicated
+    if _reviews_deduplicated:
+        from .models import Submission, recompute_review_aggregates
+        recompute_review_aggregates(Submission.objects.using(using).all())
+        _reviews_deduplicated = False
+
+
+def backfill_cycles(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Set the cycle of submissions and reviews which predate it; connected to post_migrate"""
+    with connections[using].cursor() as cursor:
+        for statement in BACKFILL_CYCLES_SQL:
+            cursor.execute(statement, {"time_zone": settings.TIME_ZONE})
@@ -0,0 +1,163 @@
+import re
+import hmac
+import time
+import hashlib
+import mimetypes
+from base64 import urlsafe_b64encode
+from urllib.parse import quote, urlencode
+
+from django.urls import reverse
+from django.conf import settings
+from django.core.signing import BadSignature, SignatureExpired
+from django.utils.cache import get_conditional_response
+from django.http import HttpResponse, StreamingHttpResponse
+
+# Only single ranges are served partially; anything else is answered with the whole file, which RFC 7233 allows
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(file_hash):
+    # Files are stored by their SHA-512 hash, so it identifies the exact bytes served
+    return f'"{file_hash!s}"' if file_hash else None
+
+
+def parse_byte_range(header, size):
+    """Return the inclusive (start, end) of a single byte range header, or None to serve the whole file
+
+    Raises ValueError for a range which cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # A suffix range, e.g. the last 500 bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def read_range(file, start, end):
+    with file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def content_disposition(basename, attachment):
+    disposition = "attachment" if attachment else "inline"
+    return f"{disposition!s}; filename*=UTF-8''{quote(basename)!s}"
+
+
+def offload_response(storage, name, basename, attachment):
+    """Hand the file to the front-end web server, which then deals with ranges itself"""
+    response = HttpResponse(content_type=mimetypes.guess_type(basename)[0] or "application/octet-stream")
+    if settings.SUBMISSION_DOWNLOAD_OFFLOAD == "nginx":
+        response["X-Accel-Redirect"] = f"{settings.SUBMISSION_DOWNLOAD_INTERNAL_URL!s}{quote(name)!s}"
+    else:
+        response["X-Sendfile"] = storage.path(name)
+    response["Content-Disposition"] = content_disposition(basename, attachment)
+    return response
+
+
+def conditional_file_response(request, storage, name, file_hash, basename, attachment):
+    """Return a 304, 206, 416 or offloaded response for a stored file, or None to serve the whole file in-process"""
+    etag = file_etag(file_hash)
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is None and settings.SUBMISSION_DOWNLOAD_OFFLOAD in ("nginx", "apache"):
+        response = offload_response(storage, name, basename, attachment)
+    elif response is None and "HTTP_RANGE" in request.META:
+        # If-Range asks for the whole file if it has changed since the client's partial copy
+        if_range = request.META.get("HTTP_IF_RANGE")
+        if if_range is None or if_range == etag:
+            size = storage.size(name)
+            try:
+                byte_range = parse_byte_range(request.META["HTTP_RANGE"], size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size!s}"
+            else:
+                if byte_range is not None:
+                    start, end = byte_range
+                    content_type = mimetypes.guess_type(basename)[0] or "application/octet-stream"
+                    file = storage.open(name, "rb")
+                    response = StreamingHttpResponse(read_range(file, start, end), status=206, content_type=content_type)
+                    response["Content-Range"] = f"bytes {start!s}-{end!s}/{size!s}"
+                    response["Content-Length"] = str(end - start + 1)
+                    response["Content-Disposition"] = content_disposition(basename, attachment)
+    if response is not None:
+        add_validators(response, etag)
+    return response
+
+
+def add_validators(response, etag):
+    if etag is None:
+        return response
+    response["ETag"] = etag
+    response["Accept-Ranges"] = "bytes"
+    # Files are only for the logged in user, who must revalidate each time but can then reuse their copy
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def signature(user_id, submission_uuid, name, basename, expires):
+    """HMAC-SHA256 of a signed download URL's fields, keyed with SUBMISSION_DOWNLOAD_SIGNING_KEY
+
+    The message is the fields joined by newlines, so any server holding the key can verify a URL without the database.
+    """
+    message = "\n".join([str(user_id), str(submission_uuid), name, basename, str(expires)])
+    key = settings.SUBMISSION_DOWNLOAD_SIGNING_KEY.encode()
+    digest = hmac.new(key, message.encode(), hashlib.sha256).digest()
+    return urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def signed_file_url(user, submission):
+    """Return a URL for the submission's file which this user can use for at least SUBMISSION_DOWNLOAD_URL_TTL seconds"""
+    name = submission.file.name
+    basename = submission.get_file_name()
+    # Rounded up to a multiple of the TTL so that every page rendered within one TTL links to the same URL, which the
+    # browser can cache and revalidate. Links therefore last between one and two TTLs.
+    ttl = settings.SUBMISSION_DOWNLOAD_URL_TTL
+    expires = (int(time.time()) // ttl + 2) * ttl
+    path = reverse("signed_download_submission", args=[submission.uuid, name])
+    query = urlencode({
+        "user": user.id,
+        "name": basename,
+        "expires": expires,
+        "signature": signature(user.id, submission.uuid, name, basename, expires),
+    })
+    return f"{path!s}?{query!s}"
+
+
+def verify_signed_url(submission_uuid, name, params):
+    """Return the basename to serve a signed URL's file under
+
+    Raises BadSignature if the URL was not issued by this application, or SignatureExpired if it has expired.
+    """
+    try:
+        user_id = int(params["user"])
+        basename = params["name"]
+        expires = int(params["expires"])
+        given = params["signature"]
+    except (KeyError, ValueError):
+        raise BadSignature("Incomplete download link")
+    if not hmac.compare_digest(given, signature(user_id, submission_uuid, name, basename, expires)):
+        raise BadSignature("Invalid download link")
+    if expires < time.time():
+        raise SignatureExpired("Expired download link")
+    return basename
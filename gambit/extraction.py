@@ -0,0 +1,189 @@
+"""Plain text extraction from submission files
+
+Parsing untrusted documents can take unbounded time and memory, so extract_file_text() runs this module in a child
+process with resource limits:
+
+    python -m gambit.extraction --max-length 200000 path/to/file.pdf
+
+This module deliberately does not import Django so that the child starts quickly.
+"""
+import io
+import os
+import re
+import sys
+import zipfile
+import argparse
+import resource
+import subprocess
+from xml.etree import ElementTree
+
+
+PDF_SIGNATURE = b"%PDF-"
+OLE_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ZIP_SIGNATURES = (b"PK\x03\x04", b"PK\x05\x06")
+
+# Members of ZIP uploads larger than this, once decompressed, are skipped rather than read into memory
+MAX_MEMBER_SIZE = 50 * 1024 * 1024
+MAX_MEMBERS = 200
+
+# Legacy Word and PowerPoint files are not parsed; their text is recovered as runs of printable characters, stored as
+# UTF-16 or as single bytes. The minimum lengths skip most of the binary noise between them.
+UTF16_RUN_RE = re.compile(rb"(?:[\x20-\x7e\xa0-\xff]\x00|[\t\r\n]\x00){4,}")
+BYTE_RUN_RE = re.compile(rb"[\x20-\x7e\t\r\n]{12,}")
+
+# Office Open XML parts holding document text, by the directory that identifies the format
+OOXML_TEXT_PARTS = (
+    ("word/", re.compile(r"^word/(document|footnotes|endnotes)\.xml$")),
+    ("ppt/", re.compile(r"^ppt/(slides/slide|notesSlides/notesSlide)\d+\.xml$")),
+)
+PART_NUMBER_RE = re.compile(r"(\d+)\.xml$")
+
+
+class TextLimitReached(Exception):
+    pass
+
+
+class TextBuffer(io.StringIO):
+    """Collects extracted text, stopping extraction once max_length characters have been written"""
+
+    def __init__(self, max_length):
+        super(TextBuffer, self).__init__()
+        self.max_length = max_length
+
+    def write(self, text):
+        remaining = self.max_length - self.tell()
+        super(TextBuffer, self).write(text[:remaining])
+        if len(text) >= remaining:
+            raise TextLimitReached()
+        return len(text)
+
+
+def extract_pdf(file, output):
+    # pdfminer is imported here as it is slow to import and only needed for PDFs
+    from pdfminer.layout import LAParams
+    from pdfminer.high_level import extract_text_to_fp
+    extract_text_to_fp(file, output, laparams=LAParams())
+
+
+def part_order(name):
+    match = PART_NUMBER_RE.search(name)
+    return (name[:match.start()], int(match.group(1))) if match else (name, 0)
+
+
+def extract_ooxml(archive, output):
+    names = archive.namelist()
+    for prefix, part_re in OOXML_TEXT_PARTS:
+        # Slides are numbered rather than ordered within the archive, and slide10 comes after slide9
+        parts = sorted((name for name in names if part_re.match(name)), key=part_order)
+        for name in parts:
+            info = archive.getinfo(name)
+            if info.file_size > MAX_MEMBER_SIZE:
+                continue
+            with archive.open(info) as part:
+                # Text runs are <w:t> in Word and <a:t> in PowerPoint, within <w:p> and <a:p> paragraphs
+                for event, element in ElementTree.iterparse(part, events=("end",)):
+                    tag = element.tag.rsplit("}", 1)[-1]
+                    if tag == "t" and element.text:
+                        output.write(element.text)
+                    elif tag == "p":
+                        output.write("\n")
+                        element.clear()
+
+
+def extract_ole(file, output):
+    data = file.read()
+    for match in UTF16_RUN_RE.finditer(data):
+        output.write(match.group().decode("utf-16-le"))
+        output.write("\n")
+    for match in BYTE_RUN_RE.finditer(data):
+        output.write(match.group().decode("ascii"))
+        output.write("\n")
+
+
+def extract_zip(archive, output, depth):
+    """Extract the text of each document inside a ZIP upload, but not of ZIPs inside those"""
+    for info in archive.infolist()[:MAX_MEMBERS]:
+        if info.is_dir() or info.file_size > MAX_MEMBER_SIZE:
+            continue
+        with archive.open(info) as member:
+            # Read at most one byte over the declared size, in case the header understates it
+            data = member.read(info.file_size + 1)
+        if len(data) > info.file_size:
+            continue
+        try:
+            extract(io.BytesIO(data), output, depth + 1)
+        except TextLimitReached:
+            raise
+        except Exception:
+            # One unreadable document does not prevent the others being indexed
+            continue
+
+
+def extract(file, output, depth=0):
+    """Write the text of the document in the seekable binary file to output, detecting its format from its content"""
+    header = file.read(len(OLE_SIGNATURE))
+    file.seek(0)
+    if header.startswith(PDF_SIGNATURE):
+        extract_pdf(file, output)
+    elif header.startswith(OLE_SIGNATURE):
+        extract_ole(file, output)
+    elif header.startswith(ZIP_SIGNATURES):
+        with zipfile.ZipFile(file) as archive:
+            if any(name.startswith(("word/", "ppt/")) for name in archive.namelist()):
+                extract_ooxml(archive, output)
+            elif depth == 0:
+                extract_zip(archive, output, depth)
+    elif depth > 0:
+        # Plain text documents are only expected inside ZIPs, as they cannot be uploaded directly
+        output.write(file.read(MAX_MEMBER_SIZE).decode("utf-8", "replace"))
+
+
+def extract_text(path, max_length):
+    """Return up to max_length characters of text from the document at path"""
+    output = TextBuffer(max_length)
+    with open(path, "rb") as file:
+        try:
+            extract(file, output)
+        except TextLimitReached:
+            pass
+    return output.getvalue()
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def extract_file_text(path, max_length, timeout, memory):
+    """Extract text from the document at path in a child process limited to timeout seconds and memory bytes
+
+    Raises ExtractionError if the child fails, runs out of time or exceeds its memory limit.
+    """
+    def limit_resources():
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        resource.setrlimit(resource.RLIMIT_CPU, (timeout, timeout))
+
+    # Makes the gambit package importable regardless of the worker's working directory
+    environment = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    command = [sys.executable, "-m", "gambit.extraction", "--max-length", str(max_length), path]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout,
+            preexec_fn=limit_resources, env=environment)
+    except subprocess.TimeoutExpired:
+        raise ExtractionError(f"Text extraction took longer than {timeout!s}s")
+    if result.returncode != 0:
+        error = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise ExtractionError(f"Text extraction failed ({result.returncode!s}): {error[-1] if error else ''!s}")
+    return result.stdout.decode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the text of a submission file")
+    parser.add_argument("--max-length", type=int, default=200000)
+    parser.add_argument("path")
+    options = parser.parse_args()
+    text = extract_text(options.path, options.max_length)
+    sys.stdout.buffer.write(text.encode("utf-8"))
+
+
+if __name__ == "__main__":
+    main()
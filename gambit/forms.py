@@ -8,6 +8,7 @@ from django.contrib.auth.forms import AuthenticationForm, PasswordResetForm, Set
 
 from .models import Submission, SubmissionReview, Profile
 from .blacklist import reserved_usernames
+from .uploadhandlers import sniff_uploaded_file
 
 
 class LoginForm(AuthenticationForm):
@@ -48,28 +49,19 @@ class LoginForm(AuthenticationForm):
         username = self.cleaned_data.get('username')
         password = self.cleaned_data.get('password')
 
-        # If we get something for username and password, check if the account exists and if it's marked active
+        # Inactive accounts are only revealed to those who give their password, which is checked once either way
         if username is not None and password:
-            self.user_cache = authenticate(self.request, username=username, password=password)
+            self.user_cache = authenticate(self.request, username=username, password=password, allow_inactive=True)
             if self.user_cache is None:
-                try:
-                    user_temp = User.objects.get(username=username)
-                except:
-                    user_temp = None
-                
-                # Check that the password provided is correct before revealing whether account is active
-                # An incorrect password will return the generic invalid login error
-                if user_temp is not None and user_temp.check_password(password):
-                    if not user_temp.is_active:
-                        raise forms.ValidationError(
-                            self.error_messages['inactive'],
-                            code='inactive',
-                        )
-                else:
-                    raise forms.ValidationError(
-                        self.error_messages['invalid_login'],
-                        code='invalid_login',
-                    )
+                raise forms.ValidationError(
+                    self.error_messages['invalid_login'],
+                    code='invalid_login',
+                )
+            if not self.user_cache.is_active:
+                raise forms.ValidationError(
+                    self.error_messages['inactive'],
+                    code='inactive',
+                )
         
         return self.cleaned_data
 
@@ -320,7 +312,14 @@ class UpdateProfileForm(forms.ModelForm):
 
 class SubmitForm(forms.ModelForm):
     """Form used for both submitting and editing"""
+    def __init__(self, *args, upload_error=None, **kwargs):
+        # Set when gambit.uploadhandlers.UploadLimitHandler refused the upload before it was received
+        self.upload_error = upload_error
+        super(SubmitForm, self).__init__(*args, **kwargs)
+
     def clean_file(self):
+        if self.upload_error:
+            raise forms.ValidationError(self.upload_error)
         file = self.cleaned_data["file"]
         # If type(file) == FieldFile, then the file has already been uploaded; either during the original submission
         # or by a previous edit so does not need to be cleaned again. If a user attempts to change their uploaded file
@@ -328,8 +327,10 @@ class SubmitForm(forms.ModelForm):
         # does not choose an alternative valid file but simply clicks submit, clean_file() will be executed against the
         # existing FieldFile and cause the aformentioned error.
         if file and not isinstance(file, FieldFile):
-            content_type = file.content_type
+            # The content type is detected from the file's magic bytes rather than trusting the client
+            content_type = sniff_uploaded_file(file)
             if content_type in settings.CONTENT_TYPES:
+                file.content_type = content_type
                 if file.size > settings.MAX_UPLOAD_SIZE:
                     # Reject files that exceed maximum upload size
                     raise forms.ValidationError("Submitted file is too large. Please limit uploads to 50MiB.")
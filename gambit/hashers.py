@@ -1,7 +1,29 @@
+import time
+
+from django.conf import settings
 from django.contrib.auth.hashers import BCryptSHA256PasswordHasher
 
 
 class ParanoidBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
-    """A subclass of BCryptSHA256PasswordHasher to increase iterations"""
+    """BCryptSHA256PasswordHasher with its work factor taken from PASSWORD_HASHER_ROUNDS
+
+    bcrypt's work factor is a whole number of doublings. must_update() compares it with the factor of stored hashes, so
+    changing the setting rehashes each password on its user's next login.
+    """
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_HASHER_ROUNDS
+
 
-    rounds = BCryptSHA256PasswordHasher.rounds + 0.5
+def time_password_check(rounds, samples=3, password="correct horse battery staple"):
+    """Return the median seconds taken to check a password hashed with the given work factor, as a login does"""
+    hasher = BCryptSHA256PasswordHasher()
+    hasher.rounds = rounds
+    encoded = hasher.encode(password, hasher.salt())
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.verify(password, encoded)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2]
@@ -0,0 +1,112 @@
+import time
+import random
+import logging
+import traceback
+
+from django.conf import settings
+from django.utils import timezone
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+
+def task_path(task):
+    if isinstance(task, str):
+        return task
+    return f"{task.__module__!s}.{task.__qualname__!s}"
+
+
+def enqueue(task, delay=0, unique=False, max_attempts=None, **kwargs):
+    """Queue a call of task, a function or its dotted path, with JSON-serialisable kwargs
+
+    The job is saved in the current transaction, so it only becomes visible to workers if that transaction commits.
+    With unique, nothing is queued if an identical call is already waiting to run. A call which is running does not
+    count, as it may have read its data before the changes which led to this call.
+    """
+    path = task_path(task)
+    if unique:
+        with transaction.atomic():
+            # Running jobs are locked by their workers, or marked as running within the worker's own transaction
+            waiting = Job.objects.select_for_update(skip_locked=True).filter(
+                task=path,
+                kwargs=kwargs,
+                status=Job.QUEUED,
+            )
+            if waiting.exists():
+                return None
+    return Job.objects.create(
+        task=path,
+        kwargs=kwargs,
+        run_after=timezone.now() + timezone.timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def retry_delay(attempts):
+    # Exponential backoff with jitter so that jobs failing together do not retry together
+    delay = min(settings.JOB_RETRY_DELAY * 2 ** (attempts - 1), settings.JOB_MAX_RETRY_DELAY)
+    return delay * random.uniform(1, 1.1)
+
+
+def run_next():
+    """Claim and run the next due job, returning it, or None if no job is due
+
+    The job's row stays locked while it runs, and the task's own changes commit together with its new status. Other
+    workers skip locked rows rather than waiting for them, and if a worker dies its lock is released with its
+    connection, so the job runs again.
+    """
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            status=Job.QUEUED,
+            run_after__lte=timezone.now(),
+        ).order_by("run_after", "id").first()
+        if job is None:
+            return None
+        job.attempts += 1
+        Job.objects.filter(pk=job.pk).update(status=Job.RUNNING)
+        try:
+            # A savepoint, so a failed task's changes are rolled back while the attempt is still recorded
+            with transaction.atomic():
+                import_string(job.task)(**job.kwargs)
+        except Exception:
+            job.last_error = traceback.format_exc()
+            if job.attempts >= job.max_attempts:
+                job.status = Job.FAILED
+                job.finished_on = timezone.now()
+                logger.exception(f"Job {job.id!s} {job.task!s} failed after {job.attempts!s} attempts")
+            else:
+                delay = retry_delay(job.attempts)
+                job.run_after = timezone.now() + timezone.timedelta(seconds=delay)
+                logger.warning(f"Job {job.id!s} {job.task!s} failed, retrying in {delay:.0f}s")
+        else:
+            job.status = Job.DONE
+            job.finished_on = timezone.now()
+        job.save()
+    return job
+
+
+def run_worker(poll_interval=1, once=False, should_stop=lambda: False):
+    """Run jobs until should_stop() is true, sleeping for poll_interval seconds whenever none are due
+
+    With once, return as soon as no jobs are due. Returns the number of jobs run.
+    """
+    count = 0
+    while not should_stop():
+        if run_next() is not None:
+            count += 1
+            continue
+        if once:
+            break
+        time.sleep(poll_interval)
+    return count
+
+
+def purge_finished(days):
+    """Delete jobs which finished successfully more than days ago"""
+    cutoff = timezone.now() - timezone.timedelta(days=days)
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_on__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,167 @@
+import time
+import email
+import logging
+import traceback
+from base64 import b64decode, b64encode
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.utils import timezone
+from django.db import transaction
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .jobs import retry_delay
+from .models import OutboxMessage
+
+
+logger = logging.getLogger(__name__)
+
+
+def serialise_attachment(attachment):
+    if isinstance(attachment, MIMEBase):
+        return {"mime": b64encode(attachment.as_bytes()).decode()}
+    filename, content, mimetype = attachment
+    if isinstance(content, str):
+        return {"filename": filename, "text": content, "mimetype": mimetype}
+    return {"filename": filename, "content": b64encode(content).decode(), "mimetype": mimetype}
+
+
+def deserialise_attachment(data):
+    if "mime" in data:
+        return email.message_from_bytes(b64decode(data["mime"]))
+    if "text" in data:
+        return data["filename"], data["text"], data["mimetype"]
+    return data["filename"], b64decode(data["content"]), data["mimetype"]
+
+
+def serialise_message(message):
+    """Return the JSON-serialisable fields of an EmailMessage, from which deserialise_message() rebuilds it"""
+    return {
+        "subject": message.subject,
+        "body": message.body,
+        "from_email": message.from_email,
+        "to": message.to,
+        "cc": message.cc,
+        "bcc": message.bcc,
+        "reply_to": message.reply_to,
+        "headers": message.extra_headers,
+        "content_subtype": message.content_subtype,
+        "alternatives": getattr(message, "alternatives", []),
+        "attachments": [serialise_attachment(attachment) for attachment in message.attachments],
+    }
+
+
+def deserialise_message(data, connection=None):
+    message = EmailMultiAlternatives(
+        subject=data["subject"],
+        body=data["body"],
+        from_email=data["from_email"],
+        to=data["to"],
+        cc=data["cc"],
+        bcc=data["bcc"],
+        reply_to=data["reply_to"],
+        headers=data["headers"],
+        alternatives=[tuple(alternative) for alternative in data["alternatives"]],
+        attachments=[deserialise_attachment(attachment) for attachment in data["attachments"]],
+        connection=connection,
+    )
+    message.content_subtype = data["content_subtype"]
+    return message
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Email backend which queues messages in the database for the send_outbox command to deliver
+
+    Messages are saved in the current transaction, so mail sent by a request which fails is never delivered. Each sent
+    EmailMessage is given an outbox_id attribute, the primary key of its OutboxMessage, for tracking its delivery.
+    """
+
+    def send_messages(self, email_messages):
+        email_messages = [message for message in email_messages if message.recipients()]
+        messages = [
+            OutboxMessage(subject=message.subject, recipients=message.recipients(), message=serialise_message(message))
+            for message in email_messages
+        ]
+        try:
+            OutboxMessage.objects.bulk_create(messages)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        for email_message, message in zip(email_messages, messages):
+            email_message.outbox_id = message.id
+        return len(messages)
+
+
+def record_failure(message, error):
+    message.attempts += 1
+    message.last_error = error
+    if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        message.status = OutboxMessage.FAILED
+        logger.error(f"Giving up on message {message.id!s} to {', '.join(message.recipients)!s}")
+    else:
+        message.send_after = timezone.now() + timezone.timedelta(seconds=retry_delay(message.attempts))
+
+
+def send_batch(batch_size=None):
+    """Deliver a batch of due messages over a single connection to OUTBOX_EMAIL_BACKEND, returning how many were due
+
+    The messages stay locked until their results are saved, so concurrent senders never deliver the same message. A
+    sender which dies mid-batch releases them to be sent again, so delivery is at least once.
+    """
+    with transaction.atomic():
+        batch = list(OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+            status=OutboxMessage.QUEUED,
+            send_after__lte=timezone.now(),
+        ).order_by("send_after", "id")[:batch_size or settings.OUTBOX_BATCH_SIZE])
+        if not batch:
+            return 0
+        connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+        try:
+            connection.open()
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception(f"Could not connect to {settings.OUTBOX_EMAIL_BACKEND!s}")
+            for message in batch:
+                record_failure(message, error)
+        else:
+            try:
+                for message in batch:
+                    try:
+                        connection.send_messages([deserialise_message(message.message, connection)])
+                    except Exception:
+                        record_failure(message, traceback.format_exc())
+                    else:
+                        message.attempts += 1
+                        message.status = OutboxMessage.SENT
+                        message.sent_on = timezone.now()
+            finally:
+                connection.close()
+        for message in batch:
+            message.save(update_fields=["attempts", "status", "send_after", "sent_on", "last_error"])
+    return len(batch)
+
+
+def run_sender(batch_size=None, poll_interval=5, once=False, should_stop=lambda: False):
+    """Send batches until should_stop() is true, sleeping for poll_interval seconds whenever no mail is due
+
+    With once, return as soon as no mail is due. Returns the number of messages attempted.
+    """
+    count = 0
+    while not should_stop():
+        sent = send_batch(batch_size)
+        count += sent
+        if sent:
+            continue
+        if once:
+            break
+        time.sleep(poll_interval)
+    return count
+
+
+def purge_sent(days):
+    """Delete messages which were sent more than days ago"""
+    cutoff = timezone.now() - timezone.timedelta(days=days)
+    deleted, _ = OutboxMessage.objects.filter(status=OutboxMessage.SENT, sent_on__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,98 @@
+import os
+import uuid
+import threading
+import socketserver
+
+from django.utils import timezone
+
+
+# Longest command or data line accepted, per RFC 5321 plus some slack for clients which fold lines badly
+MAX_LINE_LENGTH = 4096
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough of SMTP for Django's SMTP backend and smtplib to deliver to, without authentication or TLS"""
+
+    def reply(self, code, text):
+        self.wfile.write(f"{code!s} {text!s}\r\n".encode("ascii"))
+
+    def address(self, argument):
+        # "FROM:<address> SIZE=1234" or "TO:<address>"
+        path = argument.partition(":")[2].strip().split(" ")[0]
+        return path.strip("<>")
+
+    def reset(self):
+        self.sender = None
+        self.recipients = []
+
+    def handle(self):
+        self.server.count_connection()
+        self.reset()
+        self.reply(220, "gambit mail sink")
+        while True:
+            line = self.rfile.readline(MAX_LINE_LENGTH)
+            if not line:
+                return
+            command, _, argument = line.decode("utf-8", "replace").rstrip("\r\n").partition(" ")
+            command = command.upper()
+            if command in ("HELO", "EHLO"):
+                self.reply(250, "gambit mail sink")
+            elif command == "MAIL":
+                self.reset()
+                self.sender = self.address(argument)
+                self.reply(250, "OK")
+            elif command == "RCPT":
+                self.recipients.append(self.address(argument))
+                self.reply(250, "OK")
+            elif command == "DATA":
+                if self.sender is None or not self.recipients:
+                    self.reply(503, "Need MAIL and RCPT first")
+                    continue
+                self.reply(354, "End data with <CR><LF>.<CR><LF>")
+                self.server.deliver(self.sender, self.recipients, self.read_data())
+                self.reset()
+                self.reply(250, "OK")
+            elif command == "RSET":
+                self.reset()
+                self.reply(250, "OK")
+            elif command == "NOOP":
+                self.reply(250, "OK")
+            elif command == "QUIT":
+                self.reply(221, "Bye")
+                return
+            else:
+                self.reply(502, "Command not implemented")
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline(MAX_LINE_LENGTH)
+            if not line or line == b".\r\n":
+                return b"".join(lines)
+            # Clients double leading dots so that a lone dot can end the message
+            lines.append(line[1:] if line.startswith(b".") else line)
+
+
+class MailSink(socketserver.ThreadingTCPServer):
+    """Local SMTP server which writes each message it receives to a .eml file in directory instead of delivering it"""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, directory):
+        super(MailSink, self).__init__(address, SMTPSinkHandler)
+        self.directory = directory
+        self.connections = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def count_connection(self):
+        with self.lock:
+            self.connections += 1
+
+    def deliver(self, sender, recipients, data):
+        name = f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]!s}.eml"
+        envelope = f"X-Envelope-From: {sender!s}\r\nX-Envelope-To: {', '.join(recipients)!s}\r\n"
+        with open(os.path.join(self.directory, name), "wb") as file:
+            file.write(envelope.encode("utf-8"))
+            file.write(data)
+        return name
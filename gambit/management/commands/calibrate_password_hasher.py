@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from gambit.hashers import time_password_check
+
+
+# bcrypt accepts work factors from 4 to 31; beyond 20 a single check takes minutes on any hardware
+MIN_ROUNDS = 4
+MAX_ROUNDS = 20
+
+
+class Command(BaseCommand):
+    help = "Find the largest bcrypt work factor whose password check fits within a target time on this machine"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target-ms", type=float, default=250, help="Longest acceptable password check")
+        parser.add_argument("--samples", type=int, default=3, help="Checks timed at each work factor")
+
+    def handle(self, *args, **options):
+        target = options["target_ms"] / 1000
+        if target <= 0 or options["samples"] < 1:
+            raise CommandError("--target-ms and --samples must be positive")
+        chosen = None
+        for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+            seconds = time_password_check(rounds, samples=options["samples"])
+            self.stdout.write(f"{rounds!s:>2} rounds: {seconds * 1000:8.1f} ms")
+            if seconds > target:
+                break
+            chosen = rounds
+        if chosen is None:
+            raise CommandError(f"Even {MIN_ROUNDS!s} rounds take longer than {options['target_ms']:g} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Use {chosen!s} rounds; PASSWORD_HASHER_ROUNDS is currently {settings.PASSWORD_HASHER_ROUNDS!s}"
+        ))
+        if chosen != settings.PASSWORD_HASHER_ROUNDS:
+            self.stdout.write(
+                f"Set password_hasher_rounds to {chosen!s} in the core section of config.yaml. Existing passwords are "
+                f"rehashed as their users next log in."
+            )
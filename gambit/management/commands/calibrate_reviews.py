@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gambit.calibration import calibrate_reviews
+
+
+class Command(BaseCommand):
+    help = "Calculate reviewer-normalised, expertise-weighted scores for every submission in a CFP"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, default=settings.CONFERENCE_YEAR, help="CFP year to calibrate")
+
+    def handle(self, *args, **options):
+        calibrated = calibrate_reviews(options["year"])
+        self.stdout.write(self.style.SUCCESS(f"Calibrated {calibrated!s} submissions for {options['year']!s}"))
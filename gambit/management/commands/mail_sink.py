@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gambit.mailsink import MailSink
+
+
+class Command(BaseCommand):
+    help = "Run a local SMTP server which saves the mail it receives to files, for development and testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=settings.EMAIL_PORT)
+        parser.add_argument("--directory", default=settings.EMAIL_FILE_PATH, help="Where to save received messages")
+
+    def handle(self, *args, **options):
+        sink = MailSink((options["host"], options["port"]), options["directory"])
+        self.stdout.write(f"Saving mail sent to {options['host']!s}:{options['port']!s} in {options['directory']!s}")
+        try:
+            sink.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sink.server_close()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from gambit.models import Submission, recompute_review_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute the review count, totals, and averages of every submission from its reviews"
+
+    def handle(self, *args, **options):
+        updated = recompute_review_aggregates(Submission.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Reconciled review aggregates for {updated!s} submissions"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from gambit import ranking
+
+
+class Command(BaseCommand):
+    help = "Rebuild the submission ranking materialized view"
+
+    def handle(self, *args, **options):
+        ranking.refresh()
+        self.stdout.write(self.style.SUCCESS("Refreshed submission ranking"))
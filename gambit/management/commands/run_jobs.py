@@ -0,0 +1,58 @@
+import signal
+import multiprocessing
+
+from django.db import connections
+from django.core.management.base import BaseCommand
+
+from gambit import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs with a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=2, help="Number of worker processes")
+        parser.add_argument("--poll-interval", type=float, default=1, help="Seconds to wait when no jobs are due")
+        parser.add_argument("--once", action="store_true", help="Exit once no jobs are due")
+        parser.add_argument("--purge-days", type=int, default=7, help="Delete jobs which finished this many days ago")
+
+    def handle(self, *args, **options):
+        purged = jobs.purge_finished(options["purge_days"])
+        if purged:
+            self.stdout.write(f"Purged {purged!s} finished jobs")
+        if options["processes"] == 1:
+            count = work(options["poll_interval"], options["once"])
+            self.stdout.write(self.style.SUCCESS(f"Ran {count!s} jobs"))
+            return
+
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+        # Forked rather than spawned so that workers start with Django already set up
+        context = multiprocessing.get_context("fork")
+        workers = [
+            context.Process(target=work, args=(options["poll_interval"], options["once"]), daemon=True)
+            for _ in range(options["processes"])
+        ]
+        for worker in workers:
+            worker.start()
+
+        def stop(signum, frame):
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS(f"Stopped {len(workers)!s} workers"))
+
+
+def work(poll_interval, once):
+    """Worker loop; SIGTERM and SIGINT stop it once the current job has finished"""
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    signal.signal(signal.SIGINT, lambda signum, frame: stopping.append(signum))
+    try:
+        return jobs.run_worker(poll_interval=poll_interval, once=once, should_stop=lambda: bool(stopping))
+    finally:
+        connections.close_all()
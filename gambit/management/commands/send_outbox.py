@@ -0,0 +1,33 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gambit import mail
+
+
+class Command(BaseCommand):
+    help = "Deliver queued mail through OUTBOX_EMAIL_BACKEND"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE,
+            help="Messages to send over each connection")
+        parser.add_argument("--poll-interval", type=float, default=5, help="Seconds to wait when no mail is due")
+        parser.add_argument("--once", action="store_true", help="Exit once no mail is due")
+        parser.add_argument("--purge-days", type=int, default=30, help="Delete mail which was sent this many days ago")
+
+    def handle(self, *args, **options):
+        purged = mail.purge_sent(options["purge_days"])
+        if purged:
+            self.stdout.write(f"Purged {purged!s} sent messages")
+        # SIGTERM and SIGINT stop the sender once the current batch has been sent
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+        signal.signal(signal.SIGINT, lambda signum, frame: stopping.append(signum))
+        count = mail.run_sender(
+            batch_size=options["batch_size"],
+            poll_interval=options["poll_interval"],
+            once=options["once"],
+            should_stop=lambda: bool(stopping),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Attempted {count!s} messages"))
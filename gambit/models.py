@@ -1,14 +1,27 @@
 import os
+import zlib
 import uuid
 import hashlib
+import logging
 
-from django.db import models
+from django.conf import settings
+from django.db import models, connection, transaction
 from django.utils import timezone
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save, post_delete
+from django.db.models.functions import Cast, Coalesce
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 
+from . import ranking
+from .storage import submission_storage, submission_file_path, blob_hash
+
+
+logger = logging.getLogger(__name__)
+
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -17,6 +30,15 @@ class Profile(models.Model):
     affiliation = models.CharField(max_length=255, blank=True)
     email_confirmed = models.BooleanField(default=False)
 
+    # Name as last read from or written to the database; see gambit.search.update_speaker_search_vectors
+    _original_name = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Profile, cls).from_db(db, field_names, values)
+        instance._original_name = instance.__dict__.get("name")
+        return instance
+
     def __str__(self):
         username = self.user.username
         return username
@@ -43,6 +65,12 @@ def update_user_profile(sender, instance, created, **kwargs):
     instance.profile.save()
 
 
+class CycleQuerySet(models.QuerySet):
+    def active(self):
+        """Restrict to the CFP cycle of the current CONFERENCE_YEAR"""
+        return self.filter(cycle=settings.CONFERENCE_YEAR)
+
+
 class Submission(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True)
@@ -52,21 +80,92 @@ class Submission(models.Model):
     contact_email = models.EmailField()
     abstract = models.TextField(blank=True)
     conflicts = models.TextField(blank=True)
-    file = models.FileField(upload_to="uploads/submissions/%Y/%m/%d/", blank=True)
+    # Stored names are about 160 characters long, as they include the file's SHA-512 hash
+    file = models.FileField(upload_to=submission_file_path, storage=submission_storage, blank=True, db_index=True,
+        max_length=255)
+    file_name = models.CharField(max_length=255, blank=True)
     file_hash = models.CharField(max_length=128, blank=True)
     review_count = models.IntegerField(default=0)
     average_score = models.FloatField(default=0)
     total_score = models.IntegerField(default=0)
     average_expertise_score = models.FloatField(default=0)
     total_expertise_score = models.IntegerField(default=0)
+    # Maintained by gambit.search whenever the submission or its speaker's profile is saved, and whenever text has been
+    # extracted from its file. Only ever written in the database, never by save().
+    search_vector = SearchVectorField(null=True, editable=False)
+    # The CONFERENCE_YEAR of the CFP the submission was made to. Rows predating this field are backfilled from
+    # submitted_on by gambit.database.backfill_cycles.
+    cycle = models.IntegerField(null=True, editable=False, db_index=True)
+
+    objects = CycleQuerySet.as_manager()
+
+    # Fields only ever written by UPDATEs in the database, which save() leaves alone
+    DATABASE_FIELDS = {
+        "review_count",
+        "average_score",
+        "total_score",
+        "average_expertise_score",
+        "total_expertise_score",
+        "search_vector",
+    }
+
+    # Number of times this process has read a submission file to hash it
+    files_hashed = 0
+
+    # Name of the stored file as last read from or written to the database
+    _original_file_name = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Submission, cls).from_db(db, field_names, values)
+        if "file" in instance.__dict__:
+            instance._original_file_name = instance.file.name
+        return instance
+
+    def file_has_changed(self):
+        # A newly uploaded file is uncommitted until the storage backend has saved it
+        if not self.file._committed:
+            return True
+        return self.file.name != self._original_file_name or not self.file_hash
 
     def save(self, *args, **kwargs):
-        if self.file:
-            sha512 = hashlib.sha512()
-            for chunk in self.file.chunks():
-                sha512.update(chunk)
-            self.file_hash = sha512.hexdigest()
-        super(Submission, self).save(*args, **kwargs)
+        if self.cycle is None:
+            self.cycle = settings.CONFERENCE_YEAR
+        file_changed = bool(self.file) and self.file_has_changed()
+        if not self.file:
+            self.file_hash = ""
+            self.file_name = ""
+        elif file_changed:
+            # The stored name is derived from the hash, so keep the name the file was uploaded with for display
+            _, self.file_name = os.path.split(self.file.name)
+            # Uploads which came through gambit.uploadhandlers were hashed while they streamed in
+            uploaded_hashes = getattr(self.file.file, "hashes", {}) if not self.file._committed else {}
+            if "sha512" in uploaded_hashes:
+                self.file_hash = uploaded_hashes["sha512"]
+            else:
+                sha512 = hashlib.sha512()
+                for chunk in self.file.chunks():
+                    sha512.update(chunk)
+                self.file_hash = sha512.hexdigest()
+                Submission.files_hashed += 1
+                logger.info(f"Hashed submission file {self.file.name!s} ({Submission.files_hashed!s} this process)")
+        updating = not self._state.adding and not args and not kwargs.get("force_insert")
+        if updating and kwargs.get("update_fields") is None:
+            # Columns maintained in the database are never written back, as the copies loaded with this instance may
+            # be stale: review aggregates are updated by ReviewAggregateBatch and the search vector by gambit.search
+            deferred_fields = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DATABASE_FIELDS
+                and field.attname not in deferred_fields
+            ]
+        with transaction.atomic():
+            if file_changed:
+                lock_submission_file(self.file_hash)
+            super(Submission, self).save(*args, **kwargs)
+        if self._original_file_name and self._original_file_name != self.file.name:
+            release_submission_file(self._original_file_name)
+        self._original_file_name = self.file.name
 
     def __str__(self):
         title = f"{self.title!s}"
@@ -78,8 +177,8 @@ class Submission(models.Model):
     
     def has_reviewed(self, user_id):
         # Returns True if supplied user_id matches review for submission
-        reviews = [review.user.id for review in self.get_reviews()]
-        return user_id in reviews
+        # A single probe of the unique (submission, user) index
+        return SubmissionReview.objects.filter(submission=self, user_id=user_id).exists()
 
     def get_average_score(self):
         reviews = self.get_reviews()
@@ -92,10 +191,16 @@ class Submission(models.Model):
         return total_score or 0
 
     def get_file_name(self):
+        if self.file_name:
+            return self.file_name
         if self.file:
             _, tail = os.path.split(self.file.name)  # Discarding path prefix
             return tail
 
+    def in_active_cycle(self):
+        # Submissions from previous CFPs can no longer be edited or reviewed
+        return self.cycle == settings.CONFERENCE_YEAR
+
     def get_related_submissions(self):
         return Submission.objects.filter(user=self.user).exclude(uuid=self.uuid).values('uuid', 'user__id', 'title', 'submitted_on')
 
@@ -104,6 +209,67 @@ class Submission(models.Model):
         ordering = ["submitted_on"]
         verbose_name = "Submission"
         verbose_name_plural = "Submissions"
+        indexes = [
+            GinIndex(fields=["search_vector"], name="gambit_submission_search"),
+            models.Index(fields=["cycle", "submitted_on"], name="gambit_submission_cycle"),
+        ]
+
+
+def lock_submission_file(file_hash):
+    """Hold an advisory lock on a submission file's hash until the current transaction ends
+
+    Taken by uploads before storing a file and by release_submission_file before checking whether a file is still used,
+    so a file is never deleted from under an upload of the same content which has yet to commit.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [int(file_hash[:15], 16)])
+
+
+def release_submission_file(name):
+    """Delete a stored submission file once the current transaction commits, unless a submission still uses it"""
+    def delete_unreferenced_file():
+        file_hash = blob_hash(name)
+        with transaction.atomic():
+            # Files stored before content addressing are never shared, so only blobs can be uploaded again
+            if file_hash:
+                lock_submission_file(file_hash)
+            if not Submission.objects.filter(file=name).exists():
+                submission_storage.delete(name)
+    transaction.on_commit(delete_unreferenced_file)
+
+
+@receiver(post_delete, sender=Submission, dispatch_uid="release_submission_file_delete")
+def release_submission_file_delete(sender, instance, **kwargs):
+    if instance.file:
+        release_submission_file(instance.file.name)
+
+
+class SubmissionText(models.Model):
+    """Text extracted from a submission's file in the background by gambit.search.index_submission_file
+
+    Kept out of Submission so that its rows stay small, and compressed as it is only read to display or re-index it.
+    """
+    submission = models.OneToOneField(Submission, on_delete=models.CASCADE, primary_key=True,
+        related_name="extracted_text")
+    file_hash = models.CharField(max_length=128, blank=True)  # Submission.file_hash of the file the text came from
+    compressed_text = models.BinaryField()  # zlib-compressed UTF-8
+    extracted_on = models.DateTimeField(auto_now=True)
+    error = models.TextField(blank=True)  # Why extraction failed, if it did
+
+    def __str__(self):
+        submission = f"{self.submission_id!s}"
+        return submission
+
+    def get_text(self):
+        return zlib.decompress(bytes(self.compressed_text)).decode("utf-8")
+
+    def set_text(self, text):
+        self.compressed_text = zlib.compress(text.encode("utf-8"))
+
+
+    class Meta:
+        verbose_name = "Submission Text"
+        verbose_name_plural = "Submission Texts"
 
 
 class SubmissionReview(models.Model):
@@ -114,41 +280,321 @@ class SubmissionReview(models.Model):
     expertise_score = models.IntegerField(default=1, validators=[MaxValueValidator(5), MinValueValidator(1)])
     submission_score = models.IntegerField(default=1, validators=[MaxValueValidator(5), MinValueValidator(1)])
     comments = models.TextField(blank=True)
+    # Always the cycle of the reviewed submission
+    cycle = models.IntegerField(null=True, editable=False, db_index=True)
+
+    objects = CycleQuerySet.as_manager()
+
+    # Scores as last read from or written to the database; used to work out deltas for the submission aggregates
+    _original_scores = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(SubmissionReview, cls).from_db(db, field_names, values)
+        if not instance.get_deferred_fields():
+            instance._original_scores = (instance.submission_id, instance.submission_score, instance.expertise_score)
+        return instance
 
     def __str__(self):
         uuid = f"{self.uuid!s}"
         return uuid
 
+    def save(self, *args, **kwargs):
+        if self.cycle is None:
+            self.cycle = self.submission.cycle
+        super(SubmissionReview, self).save(*args, **kwargs)
+
     def get_reviewer_name(self):
-        user_id = self.user_id
-        profile = Profile.objects.get(user_id=user_id)
-        name = profile.name
+        # Reviews listed together are loaded with select_related("user__profile"), so their names are read without a
+        # query. Otherwise the name is read through user_id in one query rather than loading the user, then its profile.
+        user_field = self._meta.get_field("user")
+        if user_field.is_cached(self) and Profile.user.field.remote_field.is_cached(self.user):
+            return self.user.profile.name
+        name = Profile.objects.filter(user_id=self.user_id).values_list("name", flat=True).get()
         return name
 
 
     class Meta:
         ordering = ["submitted_on"]
+        unique_together = ("submission", "user")  # One review per reviewer; see database.deduplicate_reviews
+        indexes = [
+            models.Index(fields=["cycle", "user"], name="gambit_review_cycle_user"),
+        ]
         verbose_name = "Review"
         verbose_name_plural = "Reviews"
 
 
+class Round(models.Func):
+    """Rounds a numeric expression to two decimal places, matching the precision shown in the UI"""
+    function = "ROUND"
+    template = "%(function)s((%(expressions)s)::numeric, 2)"
+    output_field = models.FloatField()
+
+
+def recompute_review_aggregates(submissions):
+    """Recalculate the review aggregates of every submission in the queryset with a single UPDATE statement"""
+    reviews = SubmissionReview.objects.filter(submission=models.OuterRef("pk")).order_by().values("submission")
+
+    def aggregate(expression, output_field):
+        subquery = models.Subquery(reviews.annotate(value=expression).values("value"), output_field=output_field)
+        return Coalesce(subquery, 0)
+
+    return submissions.update(
+        review_count=aggregate(models.Count("pk"), models.IntegerField()),
+        total_score=aggregate(models.Sum("submission_score"), models.IntegerField()),
+        total_expertise_score=aggregate(models.Sum("expertise_score"), models.IntegerField()),
+        average_score=aggregate(Round(models.Avg("submission_score")), models.FloatField()),
+        average_expertise_score=aggregate(Round(models.Avg("expertise_score")), models.FloatField()),
+    )
+
+
 def update_submission(submission):
-    submission.review_count = SubmissionReview.objects.filter(submission=submission).count()
-    submission.average_score = float("{0:.2f}".format(submission.get_reviews().aggregate(models.Avg("submission_score"))["submission_score__avg"] or 0))
-    submission.average_expertise_score = float("{0:.2f}".format(submission.get_reviews().aggregate(models.Avg("expertise_score"))["expertise_score__avg"] or 0))
-    submission.total_score = submission.get_reviews().aggregate(models.Sum("submission_score"))["submission_score__sum"] or 0
-    submission.total_expertise_score = submission.get_reviews().aggregate(models.Sum("expertise_score"))["expertise_score__sum"] or 0
-    submission.save()
+    recompute_review_aggregates(Submission.objects.filter(pk=submission.pk))
+
+
+class ReviewAggregateBatch:
+    """Collects review score deltas for the current savepoint and applies them once per submission on commit
+
+    Each submission is updated with a single UPDATE of F() expressions so concurrent reviewers never overwrite each
+    other's counters. Submissions whose previous scores are unknown are recomputed from their reviews instead.
+    """
+
+    def __init__(self):
+        self.deltas = {}
+        self.recompute = set()
+        self.scheduled = False
+
+    @classmethod
+    def current(cls):
+        # Batches live in the connection's on_commit queue, one for each savepoint, so rolling back a savepoint or the
+        # whole transaction discards the deltas recorded within it
+        connection = transaction.get_connection()
+        if connection.in_atomic_block:
+            savepoint_ids = set(connection.savepoint_ids)
+            for callback_savepoint_ids, callback in connection.run_on_commit:
+                batch = getattr(callback, "__self__", None)
+                if isinstance(batch, cls) and callback_savepoint_ids == savepoint_ids:
+                    return batch
+        return cls()
+
+    def schedule(self):
+        # Outside of a transaction on_commit() runs the flush straight away
+        if not self.scheduled:
+            self.scheduled = True
+            transaction.on_commit(self.flush)
+
+    def add(self, submission_id, count=0, score=0, expertise=0):
+        delta = self.deltas.setdefault(submission_id, [0, 0, 0])
+        delta[0] += count
+        delta[1] += score
+        delta[2] += expertise
+
+    def flush(self):
+        for submission_id, (count, score, expertise) in self.deltas.items():
+            if submission_id in self.recompute or not (count or score or expertise):
+                continue
+            review_count = models.F("review_count") + count
+            Submission.objects.filter(pk=submission_id).update(
+                review_count=review_count,
+                total_score=models.F("total_score") + score,
+                total_expertise_score=models.F("total_expertise_score") + expertise,
+                average_score=self._average(models.F("total_score") + score, review_count, count),
+                average_expertise_score=self._average(models.F("total_expertise_score") + expertise, review_count, count),
+            )
+        if self.recompute:
+            recompute_review_aggregates(Submission.objects.filter(pk__in=self.recompute))
+
+    @staticmethod
+    def _average(total, review_count, count):
+        # The right-hand side of an UPDATE sees the row as it was before the statement, hence the offset comparison
+        average = Round(Cast(total, models.FloatField()) / Cast(review_count, models.FloatField()))
+        return models.Case(
+            models.When(review_count__gt=-count, then=average),
+            default=models.Value(0),
+            output_field=models.FloatField(),
+        )
+
 
 @receiver(post_save, sender=SubmissionReview, dispatch_uid="update_submission_details_save")
-def update_submission_save(sender, instance, **kwargs):
-    submission = instance.submission
-    update_submission(submission)
+def update_submission_save(sender, instance, created, **kwargs):
+    batch = ReviewAggregateBatch.current()
+    original = instance._original_scores
+    if created:
+        batch.add(instance.submission_id, 1, instance.submission_score, instance.expertise_score)
+    elif original is None:
+        batch.recompute.add(instance.submission_id)
+    else:
+        submission_id, submission_score, expertise_score = original
+        batch.add(submission_id, -1, -submission_score, -expertise_score)
+        batch.add(instance.submission_id, 1, instance.submission_score, instance.expertise_score)
+    instance._original_scores = (instance.submission_id, instance.submission_score, instance.expertise_score)
+    batch.schedule()
 
 @receiver(post_delete, sender=SubmissionReview, dispatch_uid="update_submission_details_delete")
 def update_submission_delete(sender, instance, **kwargs):
-    submission = instance.submission
-    update_submission(submission)
+    batch = ReviewAggregateBatch.current()
+    original = instance._original_scores
+    if original is None:
+        batch.recompute.add(instance.submission_id)
+    else:
+        submission_id, submission_score, expertise_score = original
+        batch.add(submission_id, -1, -submission_score, -expertise_score)
+    batch.schedule()
+
+
+@receiver(post_save, sender=SubmissionReview, dispatch_uid="refresh_submission_ranking_save")
+@receiver(post_delete, sender=SubmissionReview, dispatch_uid="refresh_submission_ranking_delete")
+def refresh_submission_ranking(sender, instance, **kwargs):
+    ranking.schedule_refresh()
+
+
+class SubmissionRanking(models.Model):
+    """Read-only scores and ranks from the gambit_submissionranking materialized view, see gambit.ranking"""
+    submission = models.OneToOneField(Submission, primary_key=True, on_delete=models.DO_NOTHING, related_name="ranking")
+    year = models.IntegerField()
+    review_count = models.IntegerField()
+    average_score = models.FloatField()
+    average_expertise_score = models.FloatField()
+    weighted_score = models.FloatField()
+    rank = models.IntegerField()
+    percentile = models.FloatField()
+
+
+    class Meta:
+        managed = False
+        db_table = "gambit_submissionranking"
+        ordering = ["year", "rank"]
+        verbose_name = "Submission Ranking"
+        verbose_name_plural = "Submission Rankings"
+
+
+class CalibratedScore(models.Model):
+    """Reviewer-normalised, expertise-weighted score of a submission, written by gambit.calibration"""
+    submission = models.OneToOneField(Submission, primary_key=True, on_delete=models.CASCADE, related_name="calibration")
+    year = models.IntegerField(db_index=True)
+    review_count = models.IntegerField(default=0)
+    z_score = models.FloatField(default=0)
+    calibrated_score = models.FloatField(default=0)
+    calibrated_on = models.DateTimeField(auto_now=True)
+
+
+    class Meta:
+        verbose_name = "Calibrated Score"
+        verbose_name_plural = "Calibrated Scores"
+
+
+class Job(models.Model):
+    """A call to a function which is run later by a worker started with the run_jobs command, see gambit.jobs"""
+    QUEUED = "queued"
+    RUNNING = "running"  # Only ever seen within the transaction of the worker running the job
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    task = models.CharField(max_length=255)  # Dotted path of the function to call
+    kwargs = JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_on = models.DateTimeField(auto_now_add=True)
+    finished_on = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        task = f"{self.task!s} ({self.status!s})"
+        return task
+
+
+    class Meta:
+        ordering = ["run_after"]
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        indexes = [
+            # Workers claim the next due job with this index
+            models.Index(fields=["status", "run_after"], name="gambit_job_due"),
+        ]
+
+
+class OutboxMessage(models.Model):
+    """An email queued by gambit.mail.OutboxBackend, delivered by the send_outbox command"""
+    QUEUED = "queued"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "Queued"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    )
+
+    subject = models.TextField(blank=True)
+    recipients = JSONField(default=list)
+    message = JSONField()  # See gambit.mail.serialise_message
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.IntegerField(default=0)
+    send_after = models.DateTimeField(default=timezone.now)
+    created_on = models.DateTimeField(auto_now_add=True)
+    sent_on = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        subject = f"{self.subject!s} ({self.status!s})"
+        return subject
+
+
+    class Meta:
+        ordering = ["send_after"]
+        verbose_name = "Outbox Message"
+        verbose_name_plural = "Outbox Messages"
+        indexes = [
+            models.Index(fields=["status", "send_after"], name="gambit_outbox_due"),
+        ]
+
+
+class DecisionNotification(models.Model):
+    """An email telling a submitter the programme committee's decision on their submission, see gambit.notifications"""
+    ACCEPTED = "accepted"
+    REJECTED = "rejected"
+    DECISION_CHOICES = (
+        (ACCEPTED, "Accepted"),
+        (REJECTED, "Rejected"),
+    )
+    PENDING = "pending"
+    QUEUED = "queued"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (QUEUED, "Queued"),
+        (FAILED, "Failed"),
+    )
+
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name="decision_notifications")
+    decision = models.CharField(max_length=16, choices=DECISION_CHOICES)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    # The queued email, whose status is the delivery state of the notification
+    message = models.ForeignKey(OutboxMessage, on_delete=models.SET_NULL, null=True, blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    queued_on = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        notification = f"{self.submission_id!s} ({self.decision!s})"
+        return notification
+
+
+    class Meta:
+        ordering = ["created_on"]
+        unique_together = ("submission", "decision")  # Notifying the same decision again sends nothing new
+        verbose_name = "Decision Notification"
+        verbose_name_plural = "Decision Notifications"
+        indexes = [
+            models.Index(fields=["status", "created_on"], name="gambit_notification_status"),
+        ]
 
 
 class ManagedContent(models.Model):
@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.utils import timezone
+from django.db import transaction
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+
+from . import jobs
+from .models import DecisionNotification
+
+
+TEMPLATES = {
+    DecisionNotification.ACCEPTED: "gambit/decision_accepted_email.html",
+    DecisionNotification.REJECTED: "gambit/decision_rejected_email.html",
+}
+
+
+def queue_decision_notifications(submissions, decision):
+    """Record a notification of decision for each submission not already notified of it, then start sending them
+
+    Returns the number of new notifications. They are rendered and sent by jobs, so this returns straight away however
+    many there are.
+    """
+    notified = set(DecisionNotification.objects.filter(
+        submission__in=submissions,
+        decision=decision,
+    ).values_list("submission_id", flat=True))
+    notifications = [
+        DecisionNotification(submission_id=submission_id, decision=decision)
+        for submission_id in submissions.values_list("pk", flat=True).iterator()
+        if submission_id not in notified
+    ]
+    DecisionNotification.objects.bulk_create(notifications)
+    if notifications:
+        jobs.enqueue("gambit.tasks.send_decision_notifications", unique=True)
+    return len(notifications)
+
+
+def recipients(submission):
+    # The contact address and the account's address, once each, as a speaker often uses the same one for both
+    addresses = []
+    for address in (submission.contact_email, submission.user.email):
+        if address and address.lower() not in [a.lower() for a in addresses]:
+            addresses.append(address)
+    return addresses
+
+
+def render_notification(notification):
+    submission = notification.submission
+    context = {
+        "submission": submission,
+        "name": submission.user.profile.name or submission.user.username,
+        "decision": notification.decision,
+        "conference_year": settings.CONFERENCE_YEAR,
+    }
+    subject = render_to_string("gambit/decision_subject.txt", context).strip()
+    body = render_to_string(TEMPLATES[notification.decision], context)
+    return EmailMessage(subject, body, to=recipients(submission))
+
+
+def send_notification_batch(batch_size=None):
+    """Render and send a batch of pending notifications together over one connection, returning how many were pending
+
+    The batch is claimed and marked as queued in the transaction which queues its mail in the outbox, so after a crash
+    each notification has either been queued exactly once or is still pending.
+    """
+    with transaction.atomic():
+        batch = list(DecisionNotification.objects.select_for_update(skip_locked=True, of=("self",)).filter(
+            status=DecisionNotification.PENDING,
+        ).select_related("submission__user__profile").order_by("created_on", "id")[
+            :batch_size or settings.DECISION_NOTIFICATION_BATCH_SIZE
+        ])
+        if not batch:
+            return 0
+        sendable = []
+        for notification in batch:
+            message = render_notification(notification)
+            if message.recipients():
+                sendable.append((notification, message))
+            else:
+                notification.status = DecisionNotification.FAILED
+                notification.error = "The submission has no contact or account email address"
+        connection = get_connection()
+        connection.send_messages([message for _, message in sendable])
+        now = timezone.now()
+        for notification, message in sendable:
+            notification.status = DecisionNotification.QUEUED
+            notification.queued_on = now
+            # Only set when mail goes through the outbox, whose message then records delivery
+            notification.message_id = getattr(message, "outbox_id", None)
+        for notification in batch:
+            notification.save(update_fields=["status", "queued_on", "message", "error"])
+    return len(batch)
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.db import connection, connections, DEFAULT_DB_ALIAS
+
+
+VIEW_NAME = "gambit_submissionranking"
+
+# Scores are weighted by each reviewer's expertise in the subject. Only the active CFP cycle is ranked, so refreshes
+# cost the same however many past cycles are kept; the view is recreated for a new CONFERENCE_YEAR by migrate. Ranks
+# and percentiles are calculated with the highest weighted score ranked first.
+CREATE_VIEW_SQL = f"""
+CREATE MATERIALIZED VIEW IF NOT EXISTS {VIEW_NAME!s} AS
+WITH scores AS (
+    SELECT
+        submission.uuid AS submission_id,
+        submission.cycle AS year,
+        COUNT(review.uuid) AS review_count,
+        COALESCE(AVG(review.submission_score), 0)::double precision AS average_score,
+        COALESCE(AVG(review.expertise_score), 0)::double precision AS average_expertise_score,
+        COALESCE(
+            SUM(review.submission_score * review.expertise_score)::double precision
+                / NULLIF(SUM(review.expertise_score), 0),
+            0
+        ) AS weighted_score
+    FROM gambit_submission AS submission
+    LEFT JOIN gambit_submissionreview AS review ON review.submission_id = submission.uuid
+    WHERE submission.cycle = %(year)s
+    GROUP BY submission.uuid
+)
+SELECT
+    scores.*,
+    RANK() OVER (PARTITION BY year ORDER BY weighted_score DESC, average_score DESC) AS rank,
+    100 * PERCENT_RANK() OVER (PARTITION BY year ORDER BY weighted_score, average_score) AS percentile
+FROM scores
+"""
+
+# REFRESH ... CONCURRENTLY requires a unique index covering every row
+CREATE_INDEXES_SQL = (
+    f"CREATE UNIQUE INDEX IF NOT EXISTS {VIEW_NAME!s}_submission ON {VIEW_NAME!s} (submission_id)",
+    f"CREATE INDEX IF NOT EXISTS {VIEW_NAME!s}_year_rank ON {VIEW_NAME!s} (year, rank)",
+)
+
+
+def create_view(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Create the ranking view of the CONFERENCE_YEAR cycle; connected to post_migrate"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(CREATE_VIEW_SQL, {"year": settings.CONFERENCE_YEAR})
+        for statement in CREATE_INDEXES_SQL:
+            cursor.execute(statement)
+
+
+def drop_view(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Drop the ranking view so migrations can alter the tables it reads; connected to pre_migrate"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DROP MATERIALIZED VIEW IF EXISTS {VIEW_NAME!s}")
+
+
+def refresh():
+    # Readers of the scoreboard are not blocked while the view is rebuilt
+    with connection.cursor() as cursor:
+        cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {VIEW_NAME!s}")
+
+
+def schedule_refresh():
+    """Queue a refresh of the ranking view to run SUBMISSION_RANKING_REFRESH_DELAY seconds from now
+
+    Changes arriving while a refresh is already queued are picked up by that refresh, so a burst of reviews only
+    rebuilds the view once.
+    """
+    # Imported here as gambit.models imports this module
+    from . import jobs
+    jobs.enqueue("gambit.tasks.refresh_submission_ranking", delay=settings.SUBMISSION_RANKING_REFRESH_DELAY, unique=True)
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+from django.contrib.auth.models import User, Group
+from django.db.models.signals import m2m_changed, post_save, post_delete
+
+
+PROGRAMME_COMMITTEE = "Programme Committee"
+
+# Bumped when a group is renamed or deleted, which invalidates every cached set of roles at once
+ROLES_VERSION_KEY = "gambit:roles:version"
+
+
+def _cache_key(user_id):
+    version = cache.get_or_set(ROLES_VERSION_KEY, 1, None)
+    return f"gambit:roles:{version!s}:{user_id!s}"
+
+
+def get_roles(user):
+    """Return the names of the groups a user belongs to
+
+    The result is memoised on the user object for the rest of the request. Across requests only the absence of roles is
+    cached, as the cache may be per process: a role removed through another process must stop granting access straight
+    away, whereas one granted through another process may take up to ROLE_CACHE_TIMEOUT to be seen.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, "_gambit_roles", None)
+    if roles is None:
+        key = _cache_key(user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            roles = frozenset(user.groups.values_list("name", flat=True))
+            if not roles:
+                cache.set(key, roles, settings.ROLE_CACHE_TIMEOUT)
+        user._gambit_roles = roles
+    return roles
+
+
+class RoleMiddleware:
+    """Exposes the logged in user's roles as request.roles, resolved at most once per request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.roles = SimpleLazyObject(lambda: get_roles(request.user))
+        return self.get_response(request)
+
+
+@receiver(m2m_changed, sender=User.groups.through, dispatch_uid="invalidate_roles_membership")
+def invalidate_roles_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    # Forward changes come from user.groups, reverse changes from group.user_set
+    if not reverse:
+        instance.__dict__.pop("_gambit_roles", None)
+        user_ids = [instance.pk]
+    elif pk_set is not None:
+        user_ids = pk_set
+    else:
+        # Clearing a group does not say which users were removed
+        user_ids = None
+    if user_ids is None:
+        invalidate_all_roles()
+    else:
+        cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+@receiver(post_save, sender=Group, dispatch_uid="invalidate_roles_group_save")
+@receiver(post_delete, sender=Group, dispatch_uid="invalidate_roles_group_delete")
+def invalidate_all_roles(**kwargs):
+    try:
+        cache.incr(ROLES_VERSION_KEY)
+    except ValueError:
+        cache.set(ROLES_VERSION_KEY, 1, None)
@@ -0,0 +1,184 @@
+import logging
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.dispatch import receiver
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.html import escape
+from django.db.models.signals import post_save
+from django.utils.safestring import mark_safe
+from django.db.models.functions import Coalesce
+from django.db.models import CharField, Exists, Func, OuterRef, Subquery, TextField, Value, F
+from django.contrib.postgres.search import (SearchQuery, SearchRank, SearchVector, SearchVectorCombinable,
+    SearchVectorField)
+
+from . import jobs
+from .models import Profile, Submission, SubmissionText
+from .extraction import extract_file_text, ExtractionError
+
+
+logger = logging.getLogger(__name__)
+
+
+# English stemming with accents removed, so "resume" matches "résumé"
+SEARCH_CONFIG = "gambit_search"
+
+CREATE_SEARCH_CONFIG_SQL = f"""
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{SEARCH_CONFIG!s}') THEN
+        CREATE TEXT SEARCH CONFIGURATION {SEARCH_CONFIG!s} (COPY = english);
+        ALTER TEXT SEARCH CONFIGURATION {SEARCH_CONFIG!s}
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, english_stem;
+    END IF;
+END
+$$;
+"""
+
+# Markers which HTML escaping leaves alone, replaced with <mark> once a headline has been escaped
+HIGHLIGHT_START = "[[mark]]"
+HIGHLIGHT_STOP = "[[/mark]]"
+HEADLINE_OPTIONS = f'StartSel="{HIGHLIGHT_START!s}", StopSel="{HIGHLIGHT_STOP!s}", MaxFragments=2, MaxWords=30, MinWords=12'
+
+# Fields of Submission which make up its search vector
+SEARCH_FIELDS = {"title", "authors", "abstract"}
+
+# Text extracted from the submission's file has the lowest weight. It is only stored compressed, so it cannot be read
+# back in SQL; rebuilding the rest of the vector keeps the lexemes of this weight instead.
+FILE_TEXT_WEIGHT = "D"
+
+
+class Headline(Func):
+    """ts_headline(), which is not provided by django.contrib.postgres in this version of Django"""
+    function = "ts_headline"
+    template = f"%(function)s('{SEARCH_CONFIG!s}'::regconfig, %(expressions)s)"
+    output_field = TextField()
+
+    def __init__(self, expression, query, options=HEADLINE_OPTIONS, **extra):
+        super(Headline, self).__init__(expression, query, Value(options), **extra)
+
+
+class FilterWeights(SearchVectorCombinable, Func):
+    """ts_filter(), keeping only the lexemes of a stored search vector with the given weights"""
+    function = "ts_filter"
+    output_field = SearchVectorField()
+    config = SEARCH_CONFIG
+
+    def __init__(self, expression, weights, **extra):
+        empty = Value("", output_field=SearchVectorField())
+        weights = Value(f"{{{','.join(weights).lower()!s}}}")
+        super(FilterWeights, self).__init__(Coalesce(expression, empty), weights, **extra)
+
+
+def submission_search_vector():
+    """Expression for the search vector of each submission, weighting the title above its speakers and the abstract"""
+    speaker_name = Profile.objects.filter(user=OuterRef("user")).values("name")[:1]
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG) +
+        SearchVector(Subquery(speaker_name, output_field=CharField()), "authors", weight="B", config=SEARCH_CONFIG) +
+        SearchVector("abstract", weight="C", config=SEARCH_CONFIG) +
+        FilterWeights(F("search_vector"), [FILE_TEXT_WEIGHT])
+    )
+
+
+def update_search_vectors(queryset):
+    return queryset.update(search_vector=submission_search_vector())
+
+
+def index_submission_file(submission):
+    """Extract the text of a submission's file, store it and add it to the submission's search vector
+
+    Files whose text cannot be extracted within the TEXT_EXTRACTION limits are indexed as if they were empty.
+    """
+    text = ""
+    error = ""
+    if submission.file:
+        try:
+            text = extract_file_text(
+                submission.file.path,
+                max_length=settings.TEXT_EXTRACTION_MAX_LENGTH,
+                timeout=settings.TEXT_EXTRACTION_TIMEOUT,
+                memory=settings.TEXT_EXTRACTION_MEMORY,
+            )
+        except ExtractionError as e:
+            error = str(e)
+            logger.warning(f"Could not extract text from {submission.file.name!s}: {error!s}")
+    extracted_text = SubmissionText(submission=submission, file_hash=submission.file_hash, error=error)
+    extracted_text.set_text(text)
+    extracted_text.save()
+    file_vector = SearchVector(Value(text), weight=FILE_TEXT_WEIGHT, config=SEARCH_CONFIG)
+    other_weights = [weight for weight in "ABCD" if weight != FILE_TEXT_WEIGHT]
+    Submission.objects.filter(pk=submission.pk).update(
+        search_vector=FilterWeights(F("search_vector"), other_weights) + file_vector,
+    )
+
+
+def queue_file_indexing(submission):
+    jobs.enqueue("gambit.tasks.extract_submission_text", unique=True, submission_id=str(submission.pk),
+        file_hash=submission.file_hash)
+
+
+def search_submissions(text, queryset=None):
+    """Return submissions matching text, best match first, with rank, title_headline and abstract_headline annotated"""
+    if queryset is None:
+        queryset = Submission.objects.all()
+    query = SearchQuery(text, config=SEARCH_CONFIG)
+    # Filtering on the vector column itself lets PostgreSQL use its GIN index
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F("search_vector"), query),
+        title_headline=Headline("title", query, options=f"{HEADLINE_OPTIONS!s}, HighlightAll=true"),
+        abstract_headline=Headline("abstract", query),
+    ).order_by("-rank", "-submitted_on")
+
+
+def format_headline(headline):
+    """Escape a headline and turn its highlight markers into <mark> tags"""
+    highlighted = escape(headline).replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_STOP, "</mark>")
+    return mark_safe(highlighted)
+
+
+def create_search_configuration(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Create the text search configuration and index any unindexed submissions; connected to post_migrate"""
+    with connections[using].cursor() as cursor:
+        # Installing extensions needs a superuser, which the application should not connect as
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'unaccent'")
+        if cursor.fetchone() is None:
+            raise ImproperlyConfigured(
+                "The unaccent extension is not installed; as a PostgreSQL superuser run "
+                "CREATE EXTENSION unaccent in this database and in template1, see README.md"
+            )
+        cursor.execute(CREATE_SEARCH_CONFIG_SQL)
+    # Submissions created before the search vector existed, or through bulk_create()
+    update_search_vectors(Submission.objects.using(using).filter(search_vector__isnull=True))
+    # Files uploaded before text was extracted from them, or whose extraction jobs were lost
+    extracted = SubmissionText.objects.filter(submission=OuterRef("pk"), file_hash=OuterRef("file_hash"))
+    unindexed = Submission.objects.using(using).exclude(file="").annotate(indexed=Exists(extracted))
+    for submission in unindexed.filter(indexed=False).only("uuid", "file_hash").iterator():
+        queue_file_indexing(submission)
+
+
+@receiver(post_save, sender=Submission, dispatch_uid="update_submission_search_vector")
+def update_submission_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    update_search_vectors(Submission.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Submission, dispatch_uid="queue_submission_file_indexing")
+def queue_submission_file_indexing(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "file" not in update_fields:
+        return
+    # post_save is sent before save() records the new name as the original. Stored names are derived from the file's
+    # hash, so a different name means different content.
+    if (instance.file.name or "") != (instance._original_file_name or ""):
+        queue_file_indexing(instance)
+
+
+@receiver(post_save, sender=Profile, dispatch_uid="update_speaker_search_vectors")
+def update_speaker_search_vectors(sender, instance, created, update_fields=None, **kwargs):
+    # Profiles are saved along with their user, e.g. on every login, but only the speaker's name is indexed
+    if update_fields is not None and "name" not in update_fields:
+        return
+    if not created and instance.name != instance._original_name:
+        update_search_vectors(Submission.objects.filter(user_id=instance.user_id))
+    instance._original_name = instance.name
@@ -54,6 +54,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'gambit.roles.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -130,6 +131,10 @@ LOGGING = {
             'level': 'INFO',
             'handlers': ['coloured_console'],
         },
+        'gambit': {
+            'level': 'INFO',
+            'handlers': ['coloured_console'],
+        },
         'gunicorn.access': {
             'handlers': ['coloured_console'],
         },
@@ -159,11 +164,50 @@ CACHES = {
     },
 }
 
+# Background jobs, run by the run_jobs command. A failed job is retried after JOB_RETRY_DELAY seconds, doubling with
+# each attempt up to JOB_MAX_RETRY_DELAY, until it has been attempted JOB_MAX_ATTEMPTS times.
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 30
+JOB_MAX_RETRY_DELAY = 3600
+
+# Queued mail is sent in batches of up to OUTBOX_BATCH_SIZE messages over one connection. Messages which fail are
+# retried with the same backoff as jobs until they have been attempted OUTBOX_MAX_ATTEMPTS times.
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 8
+
+# Decision notifications are rendered and queued this many at a time, each batch in its own job
+DECISION_NOTIFICATION_BATCH_SIZE = 100
+
+# Text is extracted from submission files for searching in a child process limited to TEXT_EXTRACTION_TIMEOUT seconds
+# of CPU and wall time and TEXT_EXTRACTION_MEMORY bytes of address space, keeping at most TEXT_EXTRACTION_MAX_LENGTH
+# characters per file
+TEXT_EXTRACTION_TIMEOUT = 60
+TEXT_EXTRACTION_MEMORY = 512 * 1024 * 1024
+TEXT_EXTRACTION_MAX_LENGTH = 200000
+
+# Seconds that users without any roles are cached as such. Changes invalidate the cache straight away, but the 'local'
+# cache is per process, so someone added to the Programme Committee may wait this long for access through other
+# workers. Roles which are held are read on every request, so removing them takes effect immediately.
+ROLE_CACHE_TIMEOUT = 60
+
+# Seconds the front page, help page, deadline and registration status are cached for in each process. Saving them
+# clears the cache of the process that saved them straight away.
+MANAGED_CONTENT_CACHE_TIMEOUT = 60
+
 PASSWORD_HASHERS = [
     'gambit.hashers.ParanoidBCryptSHA256PasswordHasher',
     'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
 ]
 
+# bcrypt work factor of new password hashes; choose it with the calibrate_password_hasher command. Passwords hashed
+# with a different factor are rehashed when their users next log in.
+PASSWORD_HASHER_ROUNDS = configuration["core"]["password_hasher_rounds"]
+
+# Tells inactive accounts apart from wrong passwords with a single password check, see gambit.backends
+AUTHENTICATION_BACKENDS = [
+    'gambit.backends.AccountBackend',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
@@ -188,6 +232,18 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Submission files are sent by the front-end web server once Django has authorised a download: 'nginx' uses
+# X-Accel-Redirect to SUBMISSION_DOWNLOAD_INTERNAL_URL, an internal location aliased to MEDIA_ROOT, and 'apache' uses
+# X-Sendfile. Anything else streams files from the Django process.
+SUBMISSION_DOWNLOAD_OFFLOAD = configuration["downloads"]["offload"]
+SUBMISSION_DOWNLOAD_INTERNAL_URL = configuration["downloads"]["internal_url"]
+
+# Links to submission files on submission and review pages are signed URLs which stay valid for
+# SUBMISSION_DOWNLOAD_URL_TTL seconds, see gambit.downloads.signature. Set a separate signing key to verify them on a
+# server which does not hold SECRET_KEY.
+SUBMISSION_DOWNLOAD_SIGNING_KEY = configuration["downloads"]["signing_key"] or SECRET_KEY
+SUBMISSION_DOWNLOAD_URL_TTL = configuration["downloads"]["url_ttl"]
+
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, os.path.join(os.pardir, "bower_components")),
     os.path.join(BASE_DIR, "assets"),
@@ -198,7 +254,20 @@ STATICFILES_FINDERS = [
     "compressor.finders.CompressorFinder",
 ]
 
-EMAIL_BACKEND = "anymail.backends.mailgun.EmailBackend"
+# Mail is queued in the database by the outbox backend and delivered through OUTBOX_EMAIL_BACKEND by the send_outbox
+# command. 'smtp' delivers to EMAIL_HOST:EMAIL_PORT, e.g. a local sink started with the mail_sink command, and 'file'
+# writes messages to EMAIL_FILE_PATH.
+EMAIL_BACKEND = "gambit.mail.OutboxBackend"
+OUTBOX_DELIVERY_BACKENDS = {
+    "mailgun": "anymail.backends.mailgun.EmailBackend",
+    "smtp": "django.core.mail.backends.smtp.EmailBackend",
+    "file": "django.core.mail.backends.filebased.EmailBackend",
+    "console": "django.core.mail.backends.console.EmailBackend",
+}
+OUTBOX_EMAIL_BACKEND = OUTBOX_DELIVERY_BACKENDS[configuration["mail"]["delivery"]]
+EMAIL_HOST = configuration["mail"]["smtp_host"]
+EMAIL_PORT = configuration["mail"]["smtp_port"]
+EMAIL_FILE_PATH = configuration["mail"]["file_path"]
 ANYMAIL = {
     'MAILGUN_API_KEY': configuration["anymail"]["mailgun"]["api_key"],
     'MAILGUN_SENDER_DOMAIN': configuration["anymail"]["mailgun"]["sender_domain"],
@@ -224,3 +293,21 @@ CONTENT_TYPES = [ct for ct in configuration["whitelist_content_types"]]
 
 # Maximum size in bytes of uploaded files for submissions
 MAX_UPLOAD_SIZE = configuration["core"]["max_upload_size"]
+
+# Uploads are size-limited, then hashed and sniffed as they stream in. SHA-512 is always computed as it is stored in Submission.file_hash
+FILE_UPLOAD_HANDLERS = [
+    "gambit.uploadhandlers.UploadLimitHandler",
+    "gambit.uploadhandlers.DigestMemoryFileUploadHandler",
+    "gambit.uploadhandlers.DigestTemporaryFileUploadHandler",
+]
+UPLOAD_HASH_ALGORITHMS = ["sha512"]
+if configuration["core"]["blake2b_upload_hash"]:
+    UPLOAD_HASH_ALGORITHMS.append("blake2b")
+
+# Uploads received at once per worker process and per user. Per-user slots are advisory locks, so they are shared by
+# every worker and released by the database should a worker die mid-upload
+MAX_CONCURRENT_UPLOADS_PER_WORKER = configuration["core"]["max_concurrent_uploads_per_worker"]
+MAX_CONCURRENT_UPLOADS_PER_USER = configuration["core"]["max_concurrent_uploads_per_user"]
+
+# Seconds to wait after a review changes before refreshing the submission ranking view
+SUBMISSION_RANKING_REFRESH_DELAY = configuration["core"]["ranking_refresh_delay"]
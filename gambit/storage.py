@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+
+
+def submission_file_path(instance, filename):
+    """Content-addressed location of a submission file, derived from its SHA-512 hash
+
+    The extension is kept so that MIME types can still be guessed from the stored name.
+    """
+    _, extension = os.path.splitext(filename)
+    file_hash = instance.file_hash
+    return f"uploads/submissions/blobs/{file_hash[:2]!s}/{file_hash!s}{extension.lower()!s}"
+
+
+def blob_hash(name):
+    """Return the SHA-512 hash a content-addressed name was derived from, or None for files stored before hashing"""
+    if not name.startswith("uploads/submissions/blobs/"):
+        return None
+    file_hash, _ = os.path.splitext(os.path.basename(name))
+    return file_hash
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage where a name identifies its content, so each distinct file is only stored once
+
+    Saving a name which already exists is a no-op and returns the existing name. Blobs are reference-counted by the
+    submissions pointing at them and are removed by gambit.models.release_submission_file once none remain.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Identical names hold identical content, so there is never a need to pick an alternative. Nor can a name be
+        # shortened to fit, as it would then no longer identify the content.
+        if max_length is not None and len(name) > max_length:
+            raise SuspiciousFileOperation(f"Storage name {name!r} is longer than {max_length!s} characters")
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(directory, self.directory_permissions_mode)
+        # Write to a private temporary file then rename it into place so concurrent uploads of the same file never
+        # expose a partially written blob
+        fd, temporary_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as blob:
+                for chunk in content.chunks():
+                    blob.write(chunk)
+            # mkstemp() creates files readable only by their owner, which would hide them from the web server
+            os.chmod(temporary_path, self.file_permissions_mode if self.file_permissions_mode is not None else 0o644)
+            os.replace(temporary_path, full_path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+        return name
+
+
+submission_storage = ContentAddressedStorage()
@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+from django.template.loader import render_to_string
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from . import jobs, notifications, ranking, search
+from .models import Submission
+from .tokens import account_activation_token
+
+
+# Functions run by gambit.jobs workers. Each takes JSON-serialisable keyword arguments and must be safe to run again,
+# as a job is retried if its worker dies before recording the result.
+
+
+def refresh_submission_ranking():
+    ranking.refresh()
+
+
+def send_activation_email(user_id, domain):
+    user = User.objects.select_related("profile").get(pk=user_id)
+    # Nothing to do if the account was activated before the job ran
+    if user.is_active:
+        return
+    subject = "[44CON] Activate your 44CON CFP account"
+    message = render_to_string("gambit/account_activation_email.html",
+        {
+            "user": user,
+            "domain": domain,
+            "uid": urlsafe_base64_encode(force_bytes(user.pk)).decode(),
+            "token": account_activation_token.make_token(user),
+        }
+    )
+    user.email_user(subject, message)
+
+
+def extract_submission_text(submission_id, file_hash):
+    submission = Submission.objects.filter(pk=submission_id, file_hash=file_hash).first()
+    # The submission was deleted or its file replaced, in which case the replacement queued its own job
+    if submission is None:
+        return
+    search.index_submission_file(submission)
+
+
+def send_decision_notifications():
+    # One batch per job keeps each job's transaction short; the next batch is a new job
+    if notifications.send_notification_batch():
+        jobs.enqueue(send_decision_notifications)
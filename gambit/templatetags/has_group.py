@@ -1,9 +1,10 @@
 from django import template
-from django.contrib.auth.models import Group
+
+from gambit.roles import get_roles
 
 register = template.Library()
 
+# Roles are resolved once per request and cached, so calling this repeatedly in a template costs no extra queries
 @register.filter(name="has_group")
 def has_group(user, group_name):
-    group = Group.objects.get(name=group_name)
-    return group in user.groups.all()
+    return group_name in get_roles(user)
@@ -0,0 +1,45 @@
+import csv
+import datetime
+
+from django.urls import reverse
+from django.test import TestCase
+from django.utils import timezone
+from django.test.utils import override_settings
+from django.contrib.auth.models import User
+
+from . import factories
+from gambit.models import Submission
+
+
+@override_settings(CSRF_COOKIE_SECURE=False, SESSION_COOKIE_SECURE=False)
+class ExportToCSV(TestCase):
+    def setUp(self):
+        self.superuser = User.objects.create_superuser("export.admin", "admin@example.com", factories.USER_PASSWORD)
+        self.author = factories.UserFactory.create(username="export.author")
+        self.reviewer = factories.UserFactory.create(username="export.reviewer")
+        self.submission = factories.SubmissionFactory.create(user=self.author, title="Exported")
+        submitted_on = datetime.datetime(2019, 3, 1, 12, 30, 45, tzinfo=timezone.utc)
+        Submission.objects.filter(pk=self.submission.pk).update(submitted_on=submitted_on)
+        factories.SubmissionReviewFactory.create(submission=self.submission, user=self.reviewer, comments="Great")
+        self.client.force_login(self.superuser)
+
+    def export(self, changelist):
+        response = self.client.post(reverse(changelist), {
+            "action": "_export_to_csv",
+            "select_across": "1",
+            "index": "0",
+            "_selected_action": ["unused"],
+        })
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode()
+        return list(csv.reader(content.splitlines()))
+
+    def test_export_submissions(self):
+        rows = self.export("admin:gambit_submission_changelist")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][5], "Exported")
+        self.assertEqual(rows[1][-1], "2019-03-01 12:30:45")
+
+    def test_export_reviews(self):
+        rows = self.export("admin:gambit_submissionreview_changelist")
+        self.assertEqual(rows, [["Reviewer", "Comments", "Submission Title"], [self.reviewer.profile.name, "Great", "Exported"]])
@@ -1,8 +1,22 @@
+from io import StringIO
 from django.urls import reverse
+from django.test import TestCase
 from django_webtest import WebTest
 from django.test.utils import override_settings
+from django.core.management import call_command
+from django.contrib.auth.models import User
 
 from . import factories
+from gambit.forms import LoginForm
+from gambit.hashers import ParanoidBCryptSHA256PasswordHasher
+
+
+class CountingHasher(ParanoidBCryptSHA256PasswordHasher):
+    verified = 0
+
+    def verify(self, password, encoded):
+        CountingHasher.verified += 1
+        return super(CountingHasher, self).verify(password, encoded)
 
 
 class AuthenticationTest(WebTest):
@@ -25,3 +39,55 @@ class AuthenticationTest(WebTest):
         login_form["password"] = factories.USER_PASSWORD
         response = login_form.submit().follow()
         self.assertEqual(response.context["user"].username, self.user.username)
+
+
+@override_settings(PASSWORD_HASHERS=["gambit.tests.test_authentication.CountingHasher"], PASSWORD_HASHER_ROUNDS=4)
+class LoginPasswordChecks(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("login.checked", "checked@example.com", factories.USER_PASSWORD)
+        CountingHasher.verified = 0
+
+    def login(self, password):
+        form = LoginForm(data={"username": self.user.username, "password": password})
+        valid = form.is_valid()
+        return valid, form.errors.as_data().get("__all__", [None])[0]
+
+    def test_wrong_password_checked_once(self):
+        valid, error = self.login("wrong password")
+        self.assertFalse(valid)
+        self.assertEqual(error.code, "invalid_login")
+        self.assertEqual(CountingHasher.verified, 1)
+
+    def test_inactive_account_checked_once(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        valid, error = self.login(factories.USER_PASSWORD)
+        self.assertFalse(valid)
+        self.assertEqual(error.code, "inactive")
+        self.assertEqual(CountingHasher.verified, 1)
+
+    def test_inactive_account_not_revealed_without_password(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        valid, error = self.login("wrong password")
+        self.assertEqual(error.code, "invalid_login")
+
+    def test_password_not_rehashed_on_login(self):
+        password = User.objects.get(pk=self.user.pk).password
+        self.assertEqual(self.login(factories.USER_PASSWORD), (True, None))
+        self.assertEqual(User.objects.get(pk=self.user.pk).password, password)
+
+    def test_password_rehashed_when_rounds_change(self):
+        with self.settings(PASSWORD_HASHER_ROUNDS=5):
+            self.assertEqual(self.login(factories.USER_PASSWORD), (True, None))
+        self.assertIn("$05$", User.objects.get(pk=self.user.pk).password)
+
+    def test_inactive_session_rejected(self):
+        self.client.force_login(self.user)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.get(reverse("profile"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_calibrate_command(self):
+        output = StringIO()
+        call_command("calibrate_password_hasher", target_ms=50, samples=1, stdout=output)
+        self.assertIn(" 4 rounds:", output.getvalue())
+        self.assertIn("Use ", output.getvalue())
@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import tempfile
+from unittest import skipUnless
+
+from django.conf import settings
+from django.urls import reverse
+from django.db import connection
+from django.utils import timezone
+from django.test import TestCase, tag
+from django.contrib.auth.models import User, Group
+from django.test.utils import override_settings, CaptureQueriesContext
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from . import factories
+from gambit import ranking, search
+from gambit.downloads import signed_file_url
+from gambit.models import (Profile, Submission, SubmissionReview, SubmissionDeadline, RegistrationStatus, FrontPage,
+    HelpPageItem, recompute_review_aggregates)
+
+
+# Benchmarks are slow and their latency budgets depend on the machine, so they only run when asked for:
+#   GAMBIT_BENCHMARKS=1 python manage.py test gambit --tag benchmark
+# Seeded volumes and the latency multiplier can be changed for slower or faster machines, e.g.
+#   GAMBIT_BENCHMARKS=1 GAMBIT_BENCHMARK_SUBMISSIONS=500 GAMBIT_BENCHMARK_LATENCY_SCALE=2 python manage.py test gambit
+RUN_BENCHMARKS = bool(os.environ.get("GAMBIT_BENCHMARKS"))
+SUBMISSIONS = int(os.environ.get("GAMBIT_BENCHMARK_SUBMISSIONS", 2000))
+REVIEWS = int(os.environ.get("GAMBIT_BENCHMARK_REVIEWS", 20000))
+REVIEWERS = 40
+LATENCY_SCALE = float(os.environ.get("GAMBIT_BENCHMARK_LATENCY_SCALE", 1))
+REPORT_PATH = os.environ.get(
+    "GAMBIT_BENCHMARK_REPORT",
+    os.path.join(tempfile.gettempdir(), "gambit_benchmark_report.json"),
+)
+
+
+@tag("benchmark")
+@skipUnless(RUN_BENCHMARKS, "Set GAMBIT_BENCHMARKS=1 to run the view benchmarks")
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CSRF_COOKIE_SECURE=False, SESSION_COOKIE_SECURE=False)
+class ViewBudget(TestCase):
+    """Query count and latency budgets for every view, measured against a CFP-sized database
+
+    Query budgets include the session, authentication, and context processor queries made by every page. Each result
+    is written to REPORT_PATH as JSON so that regressions show up when reviewing changes.
+    """
+
+    results = []
+
+    @classmethod
+    def setUpTestData(cls):
+        password = make_password(factories.USER_PASSWORD)
+        authors = User.objects.bulk_create(
+            User(username=f"author{i!s}", email=f"author{i!s}@example.com", password=password)
+            for i in range(SUBMISSIONS // 2 or 1)
+        )
+        reviewers = User.objects.bulk_create(
+            User(username=f"reviewer{i!s}", email=f"reviewer{i!s}@example.com", password=password)
+            for i in range(REVIEWERS)
+        )
+        # Bulk created users skip the signal which creates their profile
+        Profile.objects.bulk_create(
+            Profile(user=user, name=f"{user.username!s} name", country="United Kingdom")
+            for user in authors + reviewers
+        )
+        Group.objects.get_or_create(name="Programme Committee")[0].user_set.add(*reviewers)
+
+        submissions = Submission.objects.bulk_create(
+            Submission(
+                user=authors[i % len(authors)],
+                title=f"Submission {i!s}",
+                abstract="Abstract " * 50,
+                contact_email="speaker@example.com",
+                cycle=settings.CONFERENCE_YEAR,
+            )
+            for i in range(SUBMISSIONS)
+        )
+        # Every review pairs a distinct reviewer with the submission, honouring the one review per reviewer constraint
+        SubmissionReview.objects.bulk_create(
+            SubmissionReview(
+                submission=submissions[i % SUBMISSIONS],
+                user=reviewers[(i // SUBMISSIONS + i) % REVIEWERS],
+                expertise_score=i % 5 + 1,
+                submission_score=(i * 7) % 5 + 1,
+                comments="Comments " * 20,
+                cycle=settings.CONFERENCE_YEAR,
+            )
+            for i in range(min(REVIEWS, SUBMISSIONS * REVIEWERS))
+        )
+        recompute_review_aggregates(Submission.objects.all())
+        # Bulk created submissions skip the signal which indexes them
+        search.update_search_vectors(Submission.objects.all())
+        ranking.refresh()
+
+        SubmissionDeadline.objects.create(
+            name="Deadline",
+            open_date=timezone.now() - timezone.timedelta(days=1),
+            close_date=timezone.now() + timezone.timedelta(days=1),
+        )
+        RegistrationStatus.objects.create(name="Registration", disabled=False)
+        FrontPage.objects.create(name="Front Page")
+        HelpPageItem.objects.create(name="Help", title="Help", content="Help")
+
+        cls.author = authors[0]
+        cls.reviewer = reviewers[0]
+        cls.superuser = User.objects.create_superuser("benchmark.admin", "admin@example.com", factories.USER_PASSWORD)
+        cls.submission = Submission.objects.filter(user=cls.author).first()
+        cls.submission.file = SimpleUploadedFile("talk.pdf", b"%PDF-1.4 " + b"x" * 1024)
+        cls.submission.save()
+        cls.review = SubmissionReview.objects.filter(user=cls.reviewer).first()
+        cls.unreviewed = Submission.objects.exclude(submissionreview__user=cls.reviewer).first()
+
+    @classmethod
+    def tearDownClass(cls):
+        report = {
+            "submissions": SUBMISSIONS,
+            "reviews": REVIEWS,
+            "latency_scale": LATENCY_SCALE,
+            "results": sorted(cls.results, key=lambda result: result["view"]),
+        }
+        with open(REPORT_PATH, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        super(ViewBudget, cls).tearDownClass()
+
+    def measure(self, view, url, max_queries, max_seconds, user=None, data=None, status=200):
+        if user is not None:
+            self.client.force_login(user)
+        request = self.client.post if data is not None else self.client.get
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = request(url, data) if data is not None else request(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            seconds = time.perf_counter() - start
+        max_seconds *= LATENCY_SCALE
+        self.results.append({
+            "view": view,
+            "status": response.status_code,
+            "queries": len(queries),
+            "max_queries": max_queries,
+            "seconds": round(seconds, 4),
+            "max_seconds": max_seconds,
+        })
+        self.assertEqual(response.status_code, status)
+        self.assertLessEqual(len(queries), max_queries, f"{view!s} query budget exceeded")
+        self.assertLessEqual(seconds, max_seconds, f"{view!s} latency budget exceeded")
+        return response
+
+    def test_home(self):
+        self.measure("home", reverse("home"), max_queries=10, max_seconds=0.5)
+
+    def test_login(self):
+        self.measure("login", reverse("login"), max_queries=6, max_seconds=0.5)
+
+    def test_signup(self):
+        self.measure("signup", reverse("signup"), max_queries=6, max_seconds=0.5)
+
+    def test_help(self):
+        self.measure("help", reverse("help"), max_queries=10, max_seconds=0.5, user=self.author)
+
+    def test_profile_author(self):
+        self.measure("profile", reverse("profile"), max_queries=10, max_seconds=0.5, user=self.author)
+
+    def test_profile_reviewer(self):
+        # Each reviewer has hundreds of reviews
+        self.measure("profile_reviewer", reverse("profile"), max_queries=12, max_seconds=2, user=self.reviewer)
+
+    def test_update_profile(self):
+        self.measure("update_profile", reverse("update_profile"), max_queries=10, max_seconds=0.5, user=self.author)
+
+    def test_submit(self):
+        self.measure("submit", reverse("submit"), max_queries=10, max_seconds=0.5, user=self.author)
+
+    def test_list_submissions(self):
+        self.measure("list_submissions", reverse("list_submissions"), max_queries=10, max_seconds=0.5, user=self.reviewer)
+
+    def test_list_submissions_data(self):
+        url = reverse("list_submissions_data")
+        self.measure("list_submissions_data", url, max_queries=10, max_seconds=0.5, user=self.reviewer)
+
+    def test_list_submissions_data_deep_page(self):
+        url = reverse("list_submissions_data")
+        first = self.measure("list_submissions_data_first_page", url, max_queries=10, max_seconds=0.5,
+            user=self.reviewer)
+        url = f"{url!s}?start=10&after={first.json()['next']!s}"
+        self.measure("list_submissions_data_next_page", url, max_queries=10, max_seconds=0.5, user=self.reviewer)
+
+    def test_scoreboard(self):
+        url = reverse("scoreboard")
+        first = self.measure("scoreboard", url, max_queries=12, max_seconds=0.5, user=self.reviewer)
+        url = f"{url!s}?after={first.context['next']!s}"
+        self.measure("scoreboard_next_page", url, max_queries=12, max_seconds=0.5, user=self.reviewer)
+
+    def test_view_submission_author(self):
+        url = reverse("submission", args=[self.submission.uuid])
+        self.measure("submission", url, max_queries=14, max_seconds=0.5, user=self.author)
+
+    def test_view_submission_reviewer(self):
+        url = reverse("submission", args=[self.submission.uuid])
+        self.measure("submission_reviewer", url, max_queries=16, max_seconds=0.5, user=self.reviewer)
+
+    def test_update_submission(self):
+        url = reverse("update_submission", args=[self.submission.uuid])
+        self.measure("update_submission", url, max_queries=12, max_seconds=0.5, user=self.author)
+
+    def test_download_submission(self):
+        url = reverse("download_submission", args=[self.submission.uuid])
+        self.measure("download_submission", url, max_queries=8, max_seconds=0.5, user=self.reviewer)
+
+    def test_signed_download_submission(self):
+        # Served from the signature alone, without the session or the database
+        url = signed_file_url(self.reviewer, self.submission)
+        self.measure("signed_download_submission", url, max_queries=0, max_seconds=0.5)
+
+    def test_download_submissions(self):
+        url = reverse("download_submissions")
+        self.measure("download_submissions", url, max_queries=10, max_seconds=2, user=self.reviewer)
+
+    def test_search(self):
+        # Every submission matches, but only the best results are ranked and highlighted
+        url = f"{reverse('search')!s}?q=abstract"
+        self.measure("search", url, max_queries=10, max_seconds=1, user=self.reviewer)
+
+    def test_new_review(self):
+        url = reverse("new_review", args=[self.unreviewed.uuid])
+        self.measure("new_review", url, max_queries=14, max_seconds=0.5, user=self.reviewer)
+
+    def test_update_review(self):
+        url = reverse("update_review", args=[self.review.uuid])
+        self.measure("update_review", url, max_queries=14, max_seconds=0.5, user=self.reviewer)
+
+    def test_password_change(self):
+        self.measure("password_change", reverse("password_change"), max_queries=8, max_seconds=0.5, user=self.author)
+
+    def test_password_change_done(self):
+        url = reverse("password_change_done")
+        self.measure("password_change_done", url, max_queries=8, max_seconds=0.5, user=self.author)
+
+    def test_password_reset(self):
+        self.measure("password_reset", reverse("password_reset"), max_queries=6, max_seconds=0.5)
+
+    def test_password_reset_done(self):
+        self.measure("password_reset_done", reverse("password_reset_done"), max_queries=6, max_seconds=0.5)
+
+    def test_password_reset_confirm(self):
+        url = reverse("password_reset_confirm", args=["MQ", "invalid-token"])
+        self.measure("password_reset_confirm", url, max_queries=6, max_seconds=0.5)
+
+    def test_password_reset_complete(self):
+        self.measure("password_reset_complete", reverse("password_reset_complete"), max_queries=6, max_seconds=0.5)
+
+    def test_account_activation_sent(self):
+        self.measure("account_activation_sent", reverse("account_activation_sent"), max_queries=6, max_seconds=0.5)
+
+    def test_activate(self):
+        url = reverse("activate", args=["MQ", "invalid-token"])
+        self.measure("activate", url, max_queries=6, max_seconds=0.5)
+
+    def test_logout(self):
+        self.measure("logout", reverse("logout"), max_queries=8, max_seconds=0.5, user=self.author, status=302)
+
+    def test_admin_export_submissions(self):
+        url = reverse("admin:gambit_submission_changelist")
+        data = {
+            "action": "_export_to_csv",
+            "select_across": "1",
+            "index": "0",
+            "_selected_action": [self.submission.pk],
+        }
+        self.measure("admin_export_submissions", url, max_queries=10, max_seconds=5, user=self.superuser, data=data)
+
+    def test_admin_export_reviews(self):
+        url = reverse("admin:gambit_submissionreview_changelist")
+        data = {
+            "action": "_export_to_csv",
+            "select_across": "1",
+            "index": "0",
+            "_selected_action": [self.review.pk],
+        }
+        self.measure("admin_export_reviews", url, max_queries=10, max_seconds=10, user=self.superuser, data=data)
@@ -0,0 +1,45 @@
+import numpy as np
+from django.test import TestCase
+
+from . import factories
+from gambit.models import CalibratedScore
+from gambit.calibration import calibrate, calibrate_reviews
+
+
+class Calibrate(TestCase):
+    def test_harsh_and_lenient_reviewers_normalised(self):
+        # Reviewer 0 only gives 1s and 2s, reviewer 1 only 4s and 5s, but both prefer submission 1
+        z_scores, calibrated_scores = calibrate(
+            np.array([0, 1, 0, 1], dtype=np.int32),
+            np.array([0, 0, 1, 1], dtype=np.int32),
+            np.array([1, 2, 4, 5], dtype=np.int8),
+            np.array([3, 3, 3, 3], dtype=np.int8),
+        )
+        np.testing.assert_allclose(z_scores, [-1, 1])
+        self.assertGreater(calibrated_scores[1], calibrated_scores[0])
+
+    def test_reviewer_without_spread_ignored(self):
+        z_scores, _ = calibrate(
+            np.array([0, 1], dtype=np.int32),
+            np.array([0, 0], dtype=np.int32),
+            np.array([5, 5], dtype=np.int8),
+            np.array([5, 5], dtype=np.int8),
+        )
+        np.testing.assert_allclose(z_scores, [0, 0])
+
+
+class CalibrateReviews(TestCase):
+    def setUp(self):
+        author = factories.UserFactory.create(username="calibration.author")
+        reviewer = factories.UserFactory.create(username="calibration.reviewer")
+        self.submissions = [factories.SubmissionFactory.create(user=author) for _ in range(2)]
+        for submission, score in zip(self.submissions, (2, 4)):
+            factories.SubmissionReviewFactory.create(submission=submission, user=reviewer, submission_score=score)
+        self.year = self.submissions[0].cycle
+
+    def test_calibrated_scores_persisted(self):
+        self.assertEqual(calibrate_reviews(self.year), 2)
+        self.assertEqual(calibrate_reviews(self.year), 2)
+        scores = CalibratedScore.objects.filter(year=self.year)
+        self.assertEqual(scores.count(), 2)
+        self.assertLess(scores.get(submission=self.submissions[0]).z_score, 0)
@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from gambit.content import get_managed_content, get_managed_content_list, clear_managed_content
+from gambit.models import SubmissionDeadline, HelpPageItem
+
+
+class ManagedContentCache(TransactionTestCase):
+    def setUp(self):
+        # Flushing the database between tests does not send the signals which invalidate the cache
+        clear_managed_content()
+
+    def tearDown(self):
+        clear_managed_content()
+
+    def test_content_cached(self):
+        deadline = SubmissionDeadline.objects.create(name="Deadline")
+        self.assertEqual(get_managed_content(SubmissionDeadline), deadline)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_managed_content(SubmissionDeadline), deadline)
+
+    def test_missing_content_cached(self):
+        self.assertIsNone(get_managed_content(SubmissionDeadline))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_managed_content(SubmissionDeadline))
+
+    def test_content_invalidated_on_save(self):
+        deadline = SubmissionDeadline.objects.create(name="Deadline", message="Before")
+        self.assertEqual(get_managed_content(SubmissionDeadline).message, "Before")
+        deadline.message = "After"
+        deadline.save()
+        self.assertEqual(get_managed_content(SubmissionDeadline).message, "After")
+        deadline.delete()
+        self.assertIsNone(get_managed_content(SubmissionDeadline))
+
+    def test_content_list_invalidated_on_save(self):
+        HelpPageItem.objects.create(name="First", title="First", content="First")
+        self.assertEqual(len(get_managed_content_list(HelpPageItem)), 1)
+        HelpPageItem.objects.create(name="Second", title="Second", content="Second")
+        self.assertEqual(len(get_managed_content_list(HelpPageItem)), 2)
+
+    def test_transaction_bypasses_cache(self):
+        self.assertIsNone(get_managed_content(SubmissionDeadline))
+        with transaction.atomic():
+            deadline = SubmissionDeadline.objects.create(name="Deadline")
+            self.assertEqual(get_managed_content(SubmissionDeadline), deadline)
+        self.assertEqual(get_managed_content(SubmissionDeadline), deadline)
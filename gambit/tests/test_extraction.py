@@ -0,0 +1,61 @@
+import io
+import os
+import zipfile
+import tempfile
+from django.test import SimpleTestCase
+
+from gambit.extraction import extract_text, extract_file_text, ExtractionError, OLE_SIGNATURE
+from gambit.tests.test_search import docx
+
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), "sample_correct_file.pdf")
+
+
+class ExtractText(SimpleTestCase):
+    def write(self, content, suffix):
+        file = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+        with file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_pdf(self):
+        self.assertIn("a CFP with PoC", extract_text(SAMPLE_PDF, 1000))
+
+    def test_docx(self):
+        self.assertEqual(extract_text(self.write(docx("Résumé parsing"), ".docx"), 1000).strip(), "Résumé parsing")
+
+    def test_pptx_slides_in_order(self):
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, "w") as archive:
+            for number in (10, 2):
+                archive.writestr(f"ppt/slides/slide{number!s}.xml", (
+                    '<p:sld xmlns:p="urn:p" xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main">'
+                    f'<a:p><a:t>Slide {number!s}</a:t></a:p></p:sld>'
+                ))
+        text = extract_text(self.write(content.getvalue(), ".pptx"), 1000)
+        self.assertEqual(text.split(), ["Slide", "2", "Slide", "10"])
+
+    def test_legacy_office(self):
+        content = OLE_SIGNATURE + b"\x00" * 16 + "Legacy document text".encode("utf-16-le") + b"\x00" * 16
+        self.assertIn("Legacy document text", extract_text(self.write(content, ".doc"), 1000))
+
+    def test_documents_inside_zip(self):
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, "w") as archive:
+            archive.writestr("slides/talk.docx", docx("Inside a ZIP"))
+            archive.writestr("README.txt", "Plain notes")
+            archive.writestr("broken.pdf", "%PDF-1.4 truncated")
+        text = extract_text(self.write(content.getvalue(), ".zip"), 1000)
+        self.assertIn("Inside a ZIP", text)
+        self.assertIn("Plain notes", text)
+
+    def test_text_truncated(self):
+        self.assertEqual(extract_text(self.write(docx("Résumé parsing"), ".docx"), 6), "Résumé")
+
+    def test_child_process(self):
+        self.assertIn("a CFP with PoC", extract_file_text(SAMPLE_PDF, 1000, timeout=30, memory=512 * 1024 * 1024))
+
+    def test_child_process_memory_limited(self):
+        with self.assertRaises(ExtractionError):
+            extract_file_text(SAMPLE_PDF, 1000, timeout=30, memory=16 * 1024 * 1024)
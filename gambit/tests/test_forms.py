@@ -1,5 +1,6 @@
 from django.urls import reverse
 from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
 
 from gambit.forms import SignUpForm, SubmitForm
 from . import factories
@@ -125,3 +126,26 @@ class SubmitFormCorrect(SubmitFormBase):
                 'file': f,
             })
             self.failUnless(form.is_valid())
+
+
+class SubmitFormContentType(SubmitFormBase):
+    def submit(self, content, content_type):
+        return SubmitForm(
+            data={
+                'title': self.title,
+                'contact_email': self.contact_email,
+            },
+            files={
+                'file': SimpleUploadedFile("submission", content, content_type=content_type),
+            },
+        )
+
+    def test_submit_form_sniffed_pdf(self):
+        form = self.submit(b"%PDF-1.4 content", "application/octet-stream")
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['file'].content_type, "application/pdf")
+
+    def test_submit_form_spoofed_content_type(self):
+        form = self.submit(b"#!/bin/sh\necho spoofed", "application/pdf")
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['file'], ["File type is not allowed (Allowed types: pdf, doc/x, ppt/s, zip)."])
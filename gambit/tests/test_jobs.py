@@ -0,0 +1,90 @@
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from gambit import jobs, tasks
+from gambit.models import Job, Submission
+from gambit.tests import factories
+
+
+def record_title(title):
+    Submission.objects.create(user=factories.UserFactory.create(username="jobs.author"), title=title)
+
+
+def fail_after_write(title):
+    record_title(title)
+    raise RuntimeError("Task failed")
+
+
+def queue_again():
+    jobs.enqueue(queue_again, unique=True)
+
+
+class JobQueue(TestCase):
+    def test_job_runs(self):
+        job = jobs.enqueue(record_title, title="Queued")
+        self.assertEqual(job.task, "gambit.tests.test_jobs.record_title")
+        self.assertEqual(jobs.run_worker(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertTrue(Submission.objects.filter(title="Queued").exists())
+
+    def test_delayed_job_waits(self):
+        jobs.enqueue(record_title, delay=60, title="Later")
+        self.assertEqual(jobs.run_worker(once=True), 0)
+        self.assertFalse(Submission.objects.filter(title="Later").exists())
+
+    def test_unique_job_queued_once(self):
+        self.assertIsNotNone(jobs.enqueue(record_title, unique=True, title="Once"))
+        self.assertIsNone(jobs.enqueue(record_title, unique=True, title="Once"))
+        self.assertIsNotNone(jobs.enqueue(record_title, unique=True, title="Twice"))
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_unique_job_queued_while_running(self):
+        # A call made while the job runs may depend on changes the job did not see
+        job = jobs.enqueue(queue_again, unique=True)
+        self.assertEqual(jobs.run_next(), job)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED).count(), 1)
+
+    def test_failed_job_retried_then_failed(self):
+        job = jobs.enqueue(fail_after_write, max_attempts=2, title="Failing")
+        self.assertEqual(jobs.run_worker(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn("RuntimeError", job.last_error)
+        # The failed attempt's own changes are rolled back
+        self.assertFalse(Submission.objects.filter(title="Failing").exists())
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        jobs.run_worker(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(jobs.run_worker(once=True), 0)
+
+    def test_purge_finished(self):
+        job = jobs.enqueue(record_title, title="Old")
+        jobs.run_worker(once=True)
+        Job.objects.filter(pk=job.pk).update(finished_on=timezone.now() - timezone.timedelta(days=10))
+        jobs.enqueue(record_title, delay=60, title="Pending")
+        self.assertEqual(jobs.purge_finished(7), 1)
+        self.assertEqual(Job.objects.count(), 1)
+
+
+@override_settings(CSRF_COOKIE_SECURE=False, SESSION_COOKIE_SECURE=False)
+class ActivationEmailJob(TestCase):
+    def test_activation_email_sent(self):
+        user = factories.UserFactory.create(username="jobs.inactive", is_active=False)
+        jobs.enqueue(tasks.send_activation_email, user_id=user.id, domain="cfp.example.com")
+        self.assertEqual(len(mail.outbox), 0)
+        jobs.run_worker(once=True)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("cfp.example.com", mail.outbox[0].body)
+
+    def test_active_user_not_emailed(self):
+        user = factories.UserFactory.create(username="jobs.active", is_active=True)
+        tasks.send_activation_email(user_id=user.id, domain="cfp.example.com")
+        self.assertEqual(len(mail.outbox), 0)
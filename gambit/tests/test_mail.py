@@ -0,0 +1,111 @@
+import os
+import tempfile
+import threading
+from django.core import mail
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from django.core.mail import EmailMultiAlternatives, send_mail
+from django.core.mail.backends.base import BaseEmailBackend
+
+from gambit.mail import send_batch, run_sender, purge_sent
+from gambit.mailsink import MailSink
+from gambit.models import OutboxMessage
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError("Mail server unavailable")
+
+
+@override_settings(
+    EMAIL_BACKEND="gambit.mail.OutboxBackend",
+    OUTBOX_EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+)
+class Outbox(TestCase):
+    def test_mail_queued_not_sent(self):
+        self.assertEqual(send_mail("Subject", "Body", "cfp@example.org", ["speaker@example.com"]), 1)
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, OutboxMessage.QUEUED)
+        self.assertEqual(message.recipients, ["speaker@example.com"])
+
+    def test_queued_mail_delivered(self):
+        message = EmailMultiAlternatives(
+            "Subject", "Body", "cfp@example.org", ["speaker@example.com"], cc=["cc@example.com"],
+            attachments=[("notes.txt", "Notes", "text/plain")],
+        )
+        message.attach_alternative("<p>Body</p>", "text/html")
+        message.send()
+        self.assertEqual(run_sender(once=True), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        sent = mail.outbox[0]
+        self.assertEqual(sent.subject, "Subject")
+        self.assertEqual(sent.recipients(), ["speaker@example.com", "cc@example.com"])
+        self.assertEqual(sent.alternatives, [("<p>Body</p>", "text/html")])
+        self.assertEqual(sent.attachments, [("notes.txt", "Notes", "text/plain")])
+        queued = OutboxMessage.objects.get()
+        self.assertEqual(queued.status, OutboxMessage.SENT)
+        self.assertIsNotNone(queued.sent_on)
+
+    def test_mail_sent_in_batches(self):
+        for number in range(5):
+            send_mail(f"Message {number!s}", "Body", "cfp@example.org", ["speaker@example.com"])
+        self.assertEqual(send_batch(batch_size=2), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(run_sender(batch_size=2, once=True), 3)
+        self.assertEqual([message.subject for message in mail.outbox], [f"Message {n!s}" for n in range(5)])
+
+    @override_settings(OUTBOX_EMAIL_BACKEND="gambit.tests.test_mail.FailingBackend", OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_mail_retried(self):
+        send_mail("Subject", "Body", "cfp@example.org", ["speaker@example.com"])
+        run_sender(once=True)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, OutboxMessage.QUEUED)
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.send_after, timezone.now())
+        self.assertIn("Mail server unavailable", message.last_error)
+        # Not due again until its retry delay has passed
+        self.assertEqual(run_sender(once=True), 0)
+
+        OutboxMessage.objects.update(send_after=timezone.now())
+        run_sender(once=True)
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.FAILED)
+        self.assertEqual(message.attempts, 2)
+
+    def test_purge_sent(self):
+        send_mail("Old", "Body", "cfp@example.org", ["speaker@example.com"])
+        run_sender(once=True)
+        OutboxMessage.objects.update(sent_on=timezone.now() - timezone.timedelta(days=60))
+        send_mail("New", "Body", "cfp@example.org", ["speaker@example.com"])
+        self.assertEqual(purge_sent(30), 1)
+        self.assertEqual(OutboxMessage.objects.get().subject, "New")
+
+
+class MailSinkDelivery(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.sink = MailSink(("127.0.0.1", 0), self.directory)
+        threading.Thread(target=self.sink.serve_forever, daemon=True).start()
+        self.addCleanup(self.sink.server_close)
+        self.addCleanup(self.sink.shutdown)
+
+    def test_batch_delivered_over_one_connection(self):
+        with override_settings(
+            EMAIL_BACKEND="gambit.mail.OutboxBackend",
+            OUTBOX_EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=self.sink.server_address[1],
+        ):
+            for number in range(3):
+                send_mail(f"Message {number!s}", ".Body", "cfp@example.org", ["speaker@example.com"])
+            self.assertEqual(run_sender(once=True), 3)
+        self.assertEqual(self.sink.connections, 1)
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual(len(names), 3)
+        with open(os.path.join(self.directory, names[0]), "rb") as file:
+            content = file.read()
+        self.assertIn(b"X-Envelope-To: speaker@example.com", content)
+        self.assertIn(b"\n.Body", content)
+        self.assertEqual(OutboxMessage.objects.filter(status=OutboxMessage.SENT).count(), 3)
@@ -1,10 +1,17 @@
 import random
-from django.db import models
-from django.test import TestCase
+import hashlib
+import tempfile
+from io import StringIO
+from django.db import models, transaction, IntegrityError
+from django.core.management import call_command
+from django.core.exceptions import SuspiciousFileOperation
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth.models import User
 
 from . import factories
-from gambit.models import SubmissionReview
+from gambit.models import Submission, SubmissionReview
 
 
 class ProfileModel(TestCase):
@@ -21,13 +28,15 @@ class ProfileModel(TestCase):
 class SubmissionModel(TestCase):
     def setUp(self):
         self.submission = factories.SubmissionFactory.create()
-        generate_reviews = lambda x,y: factories.SubmissionReviewFactory.create(
+        # Each reviewer may only review a submission once
+        generate_reviews = lambda i,x,y: factories.SubmissionReviewFactory.create(
             submission=self.submission,
+            user=factories.UserFactory.create(username=f"reviewer{i!s}"),
             expertise_score=x,
             submission_score=y
         )
         for i in range(5):
-            generate_reviews(random.randint(0,5), random.randint(0,5))
+            generate_reviews(i, random.randint(0,5), random.randint(0,5))
 
     def tearDown(self):
         self.submission.delete()
@@ -58,6 +67,158 @@ class SubmissionModel(TestCase):
         self.assertEqual(self.submission.get_total_score(), total_score)
 
 
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SubmissionFileHash(TestCase):
+    def setUp(self):
+        self.content = b"%PDF-1.4 submission"
+        self.submission = factories.SubmissionFactory.create(file=SimpleUploadedFile("talk.pdf", self.content))
+
+    def tearDown(self):
+        self.submission.file.delete()
+        self.submission.delete()
+
+    def test_file_hash_computed_on_upload(self):
+        self.assertEqual(self.submission.file_hash, hashlib.sha512(self.content).hexdigest())
+
+    def test_file_not_rehashed_on_save(self):
+        files_hashed = Submission.files_hashed
+        submission = Submission.objects.get(pk=self.submission.pk)
+        submission.title = "Updated Title"
+        submission.save()
+        self.assertEqual(Submission.files_hashed, files_hashed)
+
+    def test_file_rehashed_on_change(self):
+        submission = Submission.objects.get(pk=self.submission.pk)
+        submission.file = SimpleUploadedFile("talk.pdf", b"%PDF-1.4 revised")
+        submission.save()
+        self.assertEqual(submission.file_hash, hashlib.sha512(b"%PDF-1.4 revised").hexdigest())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SubmissionFileStorage(TransactionTestCase):
+    def setUp(self):
+        self.user = factories.UserFactory.create(username="storage.author")
+
+    def submit(self, content, name="talk.pdf"):
+        return factories.SubmissionFactory.create(user=self.user, file=SimpleUploadedFile(name, content))
+
+    def test_identical_files_stored_once(self):
+        first = self.submit(b"%PDF-1.4 deck")
+        second = self.submit(b"%PDF-1.4 deck", name="resubmitted.pdf")
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(second.get_file_name(), "resubmitted.pdf")
+
+    def test_file_deleted_with_last_reference(self):
+        first = self.submit(b"%PDF-1.4 deck")
+        second = self.submit(b"%PDF-1.4 deck")
+        name, storage = first.file.name, first.file.storage
+        first.delete()
+        self.assertTrue(storage.exists(name))
+        second.delete()
+        self.assertFalse(storage.exists(name))
+
+    def test_name_fits_file_field(self):
+        submission = self.submit(b"%PDF-1.4 deck", name="talk.PDF")
+        submission.refresh_from_db()
+        self.assertTrue(submission.file.name.endswith(f"{submission.file_hash!s}.pdf"))
+        with self.assertRaises(SuspiciousFileOperation):
+            submission.file.storage.get_available_name(submission.file.name, max_length=100)
+
+
+# Aggregates are applied on transaction commit, which never happens inside TestCase
+class SubmissionReviewAggregates(TransactionTestCase):
+    def setUp(self):
+        self.author = factories.UserFactory.create(username="aggregate.author")
+        self.reviewers = [factories.UserFactory.create(username=f"aggregate.reviewer{i!s}") for i in range(3)]
+        self.submission = factories.SubmissionFactory.create(user=self.author)
+
+    def review(self, reviewer, expertise_score, submission_score):
+        return factories.SubmissionReviewFactory.create(
+            submission=self.submission,
+            user=reviewer,
+            expertise_score=expertise_score,
+            submission_score=submission_score,
+        )
+
+    def assertAggregates(self, review_count, total_score, average_score, total_expertise_score):
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.review_count, review_count)
+        self.assertEqual(self.submission.total_score, total_score)
+        self.assertEqual(self.submission.average_score, average_score)
+        self.assertEqual(self.submission.total_expertise_score, total_expertise_score)
+
+    def test_review_created(self):
+        self.review(self.reviewers[0], 3, 4)
+        self.review(self.reviewers[1], 5, 1)
+        self.assertAggregates(2, 5, 2.5, 8)
+
+    def test_review_updated(self):
+        review = self.review(self.reviewers[0], 3, 4)
+        review = SubmissionReview.objects.get(pk=review.pk)
+        review.submission_score = 2
+        review.save()
+        self.assertAggregates(1, 2, 2.0, 3)
+
+    def test_review_deleted(self):
+        self.review(self.reviewers[0], 3, 4)
+        self.review(self.reviewers[1], 2, 1).delete()
+        self.assertAggregates(1, 4, 4.0, 3)
+        SubmissionReview.objects.filter(submission=self.submission).delete()
+        self.assertAggregates(0, 0, 0.0, 0)
+
+    def test_reviews_in_one_transaction(self):
+        with transaction.atomic():
+            for reviewer in self.reviewers:
+                self.review(reviewer, 2, 3)
+        self.assertAggregates(3, 9, 3.0, 6)
+
+    def test_stale_submission_saved_after_review(self):
+        submission = Submission.objects.get(pk=self.submission.pk)
+        self.review(self.reviewers[0], 3, 4)
+        submission.title = "Edited Title"
+        submission.save()
+        self.assertAggregates(1, 4, 4.0, 3)
+
+    def test_review_in_rolled_back_savepoint(self):
+        with transaction.atomic():
+            self.review(self.reviewers[0], 3, 4)
+            with self.assertRaises(IntegrityError):
+                with transaction.atomic():
+                    self.review(self.reviewers[1], 5, 1)
+                    self.review(self.reviewers[1], 2, 2)
+        self.assertAggregates(1, 4, 4.0, 3)
+
+    def test_reconcile_review_aggregates(self):
+        self.review(self.reviewers[0], 1, 2)
+        self.review(self.reviewers[1], 4, 3)
+        Submission.objects.update(review_count=0, total_score=0, average_score=0, total_expertise_score=0)
+        call_command("reconcile_review_aggregates", stdout=StringIO())
+        self.assertAggregates(2, 5, 2.5, 5)
+
+
+@override_settings(CONFERENCE_YEAR=2019)
+class SubmissionCycle(TestCase):
+    def setUp(self):
+        self.author = factories.UserFactory.create(username="cycle.author")
+        self.reviewer = factories.UserFactory.create(username="cycle.reviewer")
+        self.current = factories.SubmissionFactory.create(user=self.author)
+        with override_settings(CONFERENCE_YEAR=2018):
+            self.previous = factories.SubmissionFactory.create(user=self.author)
+
+    def test_cycle_recorded(self):
+        self.assertEqual(self.current.cycle, 2019)
+        self.assertEqual(self.previous.cycle, 2018)
+        self.assertTrue(self.current.in_active_cycle())
+        self.assertFalse(self.previous.in_active_cycle())
+
+    def test_review_inherits_cycle(self):
+        review = factories.SubmissionReviewFactory.create(submission=self.previous, user=self.reviewer)
+        self.assertEqual(review.cycle, 2018)
+
+    def test_active_cycle(self):
+        self.assertEqual(list(Submission.objects.filter(user=self.author).active()), [self.current])
+
+
 class SubmissionReviewModel(TestCase):
     def setUp(self):
         self.submission_review = factories.SubmissionReviewFactory.create()
@@ -68,6 +229,26 @@ class SubmissionReviewModel(TestCase):
     def test_submission_review__str__(self):
         self.assertEqual(self.submission_review.__str__(), f"{self.submission_review.uuid!s}")
 
+    def test_submission_has_reviewed(self):
+        submission = self.submission_review.submission
+        self.assertTrue(submission.has_reviewed(self.submission_review.user_id))
+        self.assertFalse(submission.has_reviewed(factories.UserFactory.create(username="not.reviewed").id))
+
+    def test_reviewer_name_read_in_one_query(self):
+        review = SubmissionReview.objects.get(pk=self.submission_review.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(review.get_reviewer_name(), review.user.profile.name)
+        review = SubmissionReview.objects.select_related("user__profile").get(pk=self.submission_review.pk)
+        with self.assertNumQueries(0):
+            review.get_reviewer_name()
+
+    def test_submission_review_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            factories.SubmissionReviewFactory.create(
+                submission=self.submission_review.submission,
+                user=self.submission_review.user,
+            )
+
 
 class ManagedContentModel(TestCase):
     def setUp(self):
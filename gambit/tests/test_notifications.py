@@ -0,0 +1,102 @@
+from django.core import mail
+from django.urls import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.contrib.auth.models import User
+
+from . import factories
+from gambit import jobs
+from gambit.models import DecisionNotification, Job, OutboxMessage, Submission
+from gambit.notifications import queue_decision_notifications
+
+
+class DecisionNotifications(TestCase):
+    def setUp(self):
+        self.author = factories.UserFactory.create(username="notify.author", email="author@example.com")
+        self.author.profile.name = "Ada Speaker"
+        self.author.profile.save()
+        self.accepted = factories.SubmissionFactory.create(
+            user=self.author,
+            title="Accepted Talk",
+            contact_email="contact@example.com",
+        )
+        self.rejected = factories.SubmissionFactory.create(
+            user=self.author,
+            title="Rejected Talk",
+            contact_email="Author@example.com",
+        )
+
+    def test_notifications_queued_once(self):
+        submissions = Submission.objects.filter(pk=self.accepted.pk)
+        self.assertEqual(queue_decision_notifications(submissions, DecisionNotification.ACCEPTED), 1)
+        self.assertEqual(queue_decision_notifications(submissions, DecisionNotification.ACCEPTED), 0)
+        self.assertEqual(DecisionNotification.objects.count(), 1)
+        self.assertEqual(Job.objects.filter(task="gambit.tasks.send_decision_notifications").count(), 1)
+
+    def test_templates_rendered_per_decision(self):
+        queue_decision_notifications(Submission.objects.filter(pk=self.accepted.pk), DecisionNotification.ACCEPTED)
+        queue_decision_notifications(Submission.objects.filter(pk=self.rejected.pk), DecisionNotification.REJECTED)
+        jobs.run_worker(once=True)
+        self.assertEqual(len(mail.outbox), 2)
+        accepted, rejected = sorted(mail.outbox, key=lambda message: message.subject)
+        self.assertIn("Accepted Talk", accepted.subject)
+        self.assertIn("Congratulations", accepted.body)
+        self.assertIn("Ada Speaker", accepted.body)
+        self.assertEqual(accepted.to, ["contact@example.com", "author@example.com"])
+        self.assertIn("not\nable to accept yours", rejected.body)
+        # The same address is only sent to once
+        self.assertEqual(rejected.to, ["Author@example.com"])
+        self.assertFalse(DecisionNotification.objects.exclude(status=DecisionNotification.QUEUED).exists())
+
+    @override_settings(DECISION_NOTIFICATION_BATCH_SIZE=1)
+    def test_notifications_sent_in_batches(self):
+        queue_decision_notifications(Submission.objects.filter(user=self.author), DecisionNotification.REJECTED)
+        self.assertEqual(jobs.run_worker(once=True), 3)
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(EMAIL_BACKEND="gambit.mail.OutboxBackend")
+    def test_delivery_tracked_through_outbox(self):
+        queue_decision_notifications(Submission.objects.filter(user=self.author), DecisionNotification.ACCEPTED)
+        jobs.run_worker(once=True)
+        self.assertEqual(len(mail.outbox), 0)
+        notification = DecisionNotification.objects.get(submission=self.accepted)
+        self.assertEqual(notification.message.status, OutboxMessage.QUEUED)
+        self.assertEqual(notification.message.recipients, ["contact@example.com", "author@example.com"])
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+    def test_submission_without_address_failed(self):
+        User.objects.filter(pk=self.author.pk).update(email="")
+        Submission.objects.filter(pk=self.accepted.pk).update(contact_email="")
+        queue_decision_notifications(Submission.objects.filter(pk=self.accepted.pk), DecisionNotification.ACCEPTED)
+        jobs.run_worker(once=True)
+        self.assertEqual(DecisionNotification.objects.get().status, DecisionNotification.FAILED)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+@override_settings(CSRF_COOKIE_SECURE=False, SESSION_COOKIE_SECURE=False)
+class NotifyDecisionAction(TestCase):
+    def setUp(self):
+        self.superuser = User.objects.create_superuser("notify.admin", "admin@example.com", factories.USER_PASSWORD)
+        self.author = factories.UserFactory.create(username="notify.speaker")
+        self.submission = factories.SubmissionFactory.create(user=self.author, contact_email="speaker@example.com")
+        self.client.force_login(self.superuser)
+
+    def notify(self, **data):
+        return self.client.post(reverse("admin:gambit_submission_changelist"), dict({
+            "action": "_notify_accepted",
+            "_selected_action": [str(self.submission.pk)],
+        }, **data))
+
+    def test_confirmation_required(self):
+        response = self.notify()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["decision"], DecisionNotification.ACCEPTED)
+        # Compared as HTML, as minification may reorder the attributes
+        self.assertContains(response, '<input type="hidden" name="confirm" value="accepted">', html=True)
+        self.assertFalse(DecisionNotification.objects.exists())
+
+    def test_notifications_queued_without_sending(self):
+        response = self.notify(confirm="accepted")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(DecisionNotification.objects.get().status, DecisionNotification.PENDING)
+        self.assertEqual(len(mail.outbox), 0)
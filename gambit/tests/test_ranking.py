@@ -0,0 +1,65 @@
+from unittest import mock
+from django.conf import settings
+from django.urls import reverse
+from django.test import TransactionTestCase
+from django.test.utils import override_settings
+from django.contrib.auth.models import User
+
+from . import factories
+from gambit import ranking
+from gambit.views import SubmissionScoreboard
+from gambit.models import SubmissionRanking
+
+
+class SubmissionRankingView(TransactionTestCase):
+    def setUp(self):
+        author = factories.UserFactory.create(username="ranking.author")
+        self.expert = factories.UserFactory.create(username="ranking.expert")
+        self.novice = factories.UserFactory.create(username="ranking.novice")
+        self.first = factories.SubmissionFactory.create(user=author, title="First")
+        self.second = factories.SubmissionFactory.create(user=author, title="Second")
+        self.unreviewed = factories.SubmissionFactory.create(user=author, title="Unreviewed")
+
+    def review(self, submission, user, expertise_score, submission_score):
+        factories.SubmissionReviewFactory.create(
+            submission=submission,
+            user=user,
+            expertise_score=expertise_score,
+            submission_score=submission_score,
+        )
+
+    def test_ranking_weighted_by_expertise(self):
+        # Both submissions average 3, but the expert preferred the second
+        self.review(self.first, self.expert, 5, 1)
+        self.review(self.first, self.novice, 1, 5)
+        self.review(self.second, self.expert, 5, 5)
+        self.review(self.second, self.novice, 1, 1)
+        ranking.refresh()
+        first = SubmissionRanking.objects.get(submission=self.first)
+        second = SubmissionRanking.objects.get(submission=self.second)
+        unreviewed = SubmissionRanking.objects.get(submission=self.unreviewed)
+        self.assertEqual(first.average_score, second.average_score)
+        self.assertAlmostEqual(second.weighted_score, 26 / 6)
+        self.assertEqual((second.rank, first.rank, unreviewed.rank), (1, 2, 3))
+        self.assertEqual(second.percentile, 100)
+        self.assertEqual(unreviewed.review_count, 0)
+
+    def test_previous_cycles_not_ranked(self):
+        with override_settings(CONFERENCE_YEAR=settings.CONFERENCE_YEAR - 1):
+            previous = factories.SubmissionFactory.create(user=self.first.user, title="Previous")
+        ranking.refresh()
+        self.assertFalse(SubmissionRanking.objects.filter(submission=previous).exists())
+        self.assertEqual(SubmissionRanking.objects.count(), 3)
+
+    @override_settings(CSRF_COOKIE_SECURE=False, SESSION_COOKIE_SECURE=False)
+    def test_scoreboard_paginated(self):
+        # All three submissions are tied, so pages are split within a rank
+        ranking.refresh()
+        self.client.force_login(User.objects.create_superuser("ranking.admin", "admin@example.com", "password"))
+        with mock.patch.object(SubmissionScoreboard, "page_size", 2):
+            first = self.client.get(reverse("scoreboard"))
+            second = self.client.get(reverse("scoreboard"), {"after": first.context["next"]})
+        pages = [[row["submission__uuid"] for row in page.context["rankings"]] for page in (first, second)]
+        self.assertEqual([len(page) for page in pages], [2, 1])
+        self.assertCountEqual(pages[0] + pages[1], [self.first.uuid, self.second.uuid, self.unreviewed.uuid])
+        self.assertNotIn("next", second.context)
@@ -0,0 +1,148 @@
+import io
+import zipfile
+import tempfile
+from django.urls import reverse
+from django.utils import timezone
+from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import override_settings
+from django.contrib.auth.models import Group
+
+from . import factories
+from gambit import jobs
+from gambit.models import Job, Submission, SubmissionText
+from gambit.roles import PROGRAMME_COMMITTEE
+from gambit.search import search_submissions, format_headline
+
+
+class SearchSubmissions(TestCase):
+    def setUp(self):
+        self.author = factories.UserFactory.create(username="search.author")
+        self.author.profile.name = "Zoë Speaker"
+        self.author.profile.save()
+        self.in_title = factories.SubmissionFactory.create(
+            user=self.author,
+            title="Fuzzing résumé parsers",
+            abstract="A talk about file formats.",
+        )
+        self.in_abstract = factories.SubmissionFactory.create(
+            user=self.author,
+            title="File formats",
+            abstract="Lessons learned fuzzing document parsers.",
+        )
+        self.unrelated = factories.SubmissionFactory.create(
+            user=self.author,
+            title="Radio",
+            abstract="Software defined radio.",
+        )
+
+    def test_title_ranked_above_abstract(self):
+        results = list(search_submissions("fuzzing"))
+        self.assertEqual(results, [self.in_title, self.in_abstract])
+
+    def test_accents_and_stems_ignored(self):
+        self.assertEqual(list(search_submissions("resumes")), [self.in_title])
+
+    def test_vector_updated_on_save(self):
+        self.unrelated.abstract = "Fuzzing radio firmware."
+        self.unrelated.save()
+        self.assertIn(self.unrelated, search_submissions("fuzzing"))
+
+    def test_speaker_name_indexed(self):
+        self.assertEqual(search_submissions("zoe").count(), 3)
+        self.author.profile.name = "Alex Speaker"
+        self.author.profile.save()
+        self.assertEqual(search_submissions("zoe").count(), 0)
+        self.assertEqual(search_submissions("alex").count(), 3)
+
+    def test_vectors_not_rebuilt_on_login(self):
+        Submission.objects.filter(user=self.author).update(search_vector=None)
+        self.author.last_login = timezone.now()
+        self.author.save()
+        self.assertFalse(Submission.objects.filter(user=self.author, search_vector__isnull=False).exists())
+
+    def test_headline_escaped_and_highlighted(self):
+        self.in_title.abstract = "<script>fuzzing</script>"
+        self.in_title.save()
+        headline = search_submissions("fuzzing").get(pk=self.in_title.pk).abstract_headline
+        self.assertEqual(format_headline(headline), "&lt;script&gt;<mark>fuzzing</mark>&lt;/script&gt;")
+
+
+def docx(text):
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, "w") as archive:
+        archive.writestr("word/document.xml", (
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+            f'<w:p><w:r><w:t>{text!s}</w:t></w:r></w:p></w:body></w:document>'
+        ))
+    return content.getvalue()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SearchSubmissionFiles(TestCase):
+    def setUp(self):
+        self.submission = factories.SubmissionFactory.create(
+            user=factories.UserFactory.create(username="search.files"),
+            title="Radio",
+            abstract="Software defined radio.",
+            file=SimpleUploadedFile("talk.docx", docx("Baseband firmware teardown")),
+        )
+
+    def test_extraction_queued_on_upload(self):
+        self.assertEqual(Job.objects.filter(task="gambit.tasks.extract_submission_text").count(), 1)
+        self.submission.title = "Radio firmware"
+        self.submission.save()
+        self.assertEqual(Job.objects.filter(task="gambit.tasks.extract_submission_text").count(), 1)
+
+    def test_file_text_searchable(self):
+        self.assertEqual(search_submissions("baseband").count(), 0)
+        jobs.run_worker(once=True)
+        self.assertEqual(list(search_submissions("baseband")), [self.submission])
+        extracted_text = SubmissionText.objects.get(submission=self.submission)
+        self.assertEqual(extracted_text.get_text().strip(), "Baseband firmware teardown")
+        self.assertEqual(extracted_text.file_hash, self.submission.file_hash)
+
+    def test_file_text_kept_when_submission_saved(self):
+        jobs.run_worker(once=True)
+        self.submission.abstract = "Updated abstract."
+        self.submission.save()
+        self.assertEqual(list(search_submissions("baseband")), [self.submission])
+        self.assertEqual(list(search_submissions("updated")), [self.submission])
+
+    def test_file_text_replaced_with_file(self):
+        jobs.run_worker(once=True)
+        self.submission.file = SimpleUploadedFile("talk.docx", docx("Satellite uplinks"))
+        self.submission.save()
+        jobs.run_worker(once=True)
+        self.assertEqual(search_submissions("baseband").count(), 0)
+        self.assertEqual(list(search_submissions("satellite")), [self.submission])
+
+    def test_unreadable_file_indexed_as_empty(self):
+        self.submission.file = SimpleUploadedFile("talk.pdf", b"%PDF-1.4 truncated")
+        self.submission.save()
+        jobs.run_worker(once=True)
+        extracted_text = SubmissionText.objects.get(submission=self.submission)
+        self.assertEqual(extracted_text.get_text(), "")
+        self.assertNotEqual(extracted_text.error, "")
+        self.assertEqual(list(search_submissions("radio")), [self.submission])
+
+
+@override_settings(CSRF_COOKIE_SECURE=False, SESSION_COOKIE_SECURE=False)
+class SearchView(TestCase):
+    def setUp(self):
+        self.author = factories.UserFactory.create(username="search.view.author")
+        self.reviewer = factories.UserFactory.create(username="search.view.reviewer")
+        Group.objects.get_or_create(name=PROGRAMME_COMMITTEE)[0].user_set.add(self.reviewer)
+        factories.SubmissionFactory.create(user=self.author, title="Fuzzing parsers")
+
+    def test_search_results(self):
+        self.client.force_login(self.reviewer)
+        response = self.client.get(reverse("search"), {"q": "fuzzing"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["results"]), 1)
+        self.assertContains(response, "<mark>Fuzzing</mark>")
+
+    def test_forbidden_for_authors(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse("search"), {"q": "fuzzing"})
+        self.assertEqual(response.status_code, 403)
@@ -1,8 +1,10 @@
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.template import Context, Template
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import User, Group
 
 from . import factories
+from gambit.roles import PROGRAMME_COMMITTEE, get_roles
 
 
 class HasGroup(TestCase):
@@ -19,3 +21,43 @@ class HasGroup(TestCase):
     def test_has_group_permission(self):
         rendered = self.TEMPLATE.render(Context({'user': self.user}))
         self.assertIn(rendered, "Success")
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class Roles(TestCase):
+    def setUp(self):
+        self.group, created = Group.objects.get_or_create(name=PROGRAMME_COMMITTEE)
+        self.user = factories.UserFactory.create(username="roles.user")
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_no_roles_cached(self):
+        self.assertEqual(get_roles(self.fresh_user()), frozenset())
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_roles(user), frozenset())
+
+    def test_held_roles_read_every_request(self):
+        # Other processes cannot invalidate this process's cache, so revoking a role must not wait for it to expire
+        self.user.groups.add(self.group)
+        self.assertIn(PROGRAMME_COMMITTEE, get_roles(self.fresh_user()))
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            self.assertIn(PROGRAMME_COMMITTEE, get_roles(user))
+        with self.assertNumQueries(0):
+            self.assertIn(PROGRAMME_COMMITTEE, get_roles(user))
+
+    def test_roles_invalidated_on_membership_change(self):
+        self.assertNotIn(PROGRAMME_COMMITTEE, get_roles(self.fresh_user()))
+        self.group.user_set.add(self.user)
+        self.assertIn(PROGRAMME_COMMITTEE, get_roles(self.fresh_user()))
+        self.user.groups.remove(self.group)
+        self.assertNotIn(PROGRAMME_COMMITTEE, get_roles(self.fresh_user()))
+
+    def test_roles_invalidated_on_group_rename(self):
+        self.user.groups.add(self.group)
+        self.assertIn(PROGRAMME_COMMITTEE, get_roles(self.fresh_user()))
+        self.group.name = "Former Programme Committee"
+        self.group.save()
+        self.assertNotIn(PROGRAMME_COMMITTEE, get_roles(self.fresh_user()))
@@ -0,0 +1,123 @@
+import hashlib
+
+from django.conf import settings
+from django.utils import timezone
+from django.urls import reverse
+from django.test import Client, TestCase, RequestFactory
+from django.test.utils import override_settings
+from django.db import connection
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import SkipFile, StopFutureHandlers
+
+from . import factories
+from gambit.models import SubmissionDeadline
+from gambit import uploadhandlers
+from gambit.uploadhandlers import (DigestMemoryFileUploadHandler, UploadLimitHandler, sniff_content_type,
+    UPLOAD_LIMIT_REACHED, UPLOAD_TOO_LARGE)
+
+
+class DigestUploadHandler(TestCase):
+    CONTENT = b"%PDF-1.4 " + b"x" * 100000
+
+    def upload(self, chunk_size=4096):
+        handler = DigestMemoryFileUploadHandler()
+        handler.handle_raw_input(None, {}, len(self.CONTENT), None)
+        # StopFutureHandlers is raised once the memory handler takes the file
+        with self.assertRaises(StopFutureHandlers):
+            handler.new_file("file", "talk.pdf", "application/pdf", len(self.CONTENT))
+        for start in range(0, len(self.CONTENT), chunk_size):
+            handler.receive_data_chunk(self.CONTENT[start:start + chunk_size], start)
+        return handler.file_complete(len(self.CONTENT))
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=2621440, UPLOAD_HASH_ALGORITHMS=["sha512", "blake2b"])
+    def test_upload_hashed_while_streaming(self):
+        uploaded_file = self.upload()
+        self.assertEqual(uploaded_file.hashes["sha512"], hashlib.sha512(self.CONTENT).hexdigest())
+        self.assertEqual(uploaded_file.hashes["blake2b"], hashlib.blake2b(self.CONTENT).hexdigest())
+        self.assertEqual(uploaded_file.sniffed_content_type, "application/pdf")
+
+    def test_sniff_content_type(self):
+        self.assertEqual(sniff_content_type(b"PK\x03\x04[Content_Types].xml word/document.xml"),
+            "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+        self.assertEqual(sniff_content_type(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/vnd.ms-powerpoint"),
+            "application/vnd.ms-powerpoint")
+        self.assertIsNone(sniff_content_type(b"MZ\x90\x00"))
+
+
+class UploadLimit(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().post("/submit/")
+        self.handler = UploadLimitHandler(self.request)
+
+    def test_upload_rejected_on_content_length(self):
+        content_length = settings.MAX_UPLOAD_SIZE + settings.DATA_UPLOAD_MAX_MEMORY_SIZE + 1
+        self.assertIsNone(self.handler.handle_raw_input(None, {}, content_length, b"boundary"))
+        self.assertEqual(self.request.upload_error, UPLOAD_TOO_LARGE)
+        with self.assertRaises(SkipFile):
+            self.handler.new_file("file", "talk.pdf", "application/pdf", None)
+        self.handler.upload_complete()
+
+    def test_upload_cut_off_when_limit_passed(self):
+        self.assertIsNone(self.handler.handle_raw_input(None, {}, 1024, b"boundary"))
+        self.handler.new_file("file", "talk.pdf", "application/pdf", None)
+        self.assertEqual(self.handler.receive_data_chunk(b"x" * 1024, 0), b"x" * 1024)
+        with self.assertRaises(SkipFile):
+            self.handler.receive_data_chunk(b"x" * 1024, settings.MAX_UPLOAD_SIZE)
+        self.handler.upload_complete()
+        self.assertEqual(self.request.upload_error, UPLOAD_TOO_LARGE)
+
+    def test_slots_only_taken_for_files(self):
+        for _ in range(settings.MAX_CONCURRENT_UPLOADS_PER_WORKER):
+            uploadhandlers._worker_uploads.acquire()
+        try:
+            # A form posted without a file goes through while every slot is taken
+            self.handler.handle_raw_input(None, {}, 1024, b"boundary")
+            self.handler.upload_complete()
+            self.assertIsNone(getattr(self.request, "upload_error", None))
+            with self.assertRaises(SkipFile):
+                self.handler.new_file("file", "talk.pdf", "application/pdf", None)
+            self.assertEqual(self.request.upload_error, UPLOAD_LIMIT_REACHED)
+        finally:
+            for _ in range(settings.MAX_CONCURRENT_UPLOADS_PER_WORKER):
+                uploadhandlers._worker_uploads.release()
+
+    def test_user_slot_locked_until_upload_complete(self):
+        def locked_slots():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND objsubid = 2 AND classid = %s",
+                    [self.request.user.pk])
+                return cursor.fetchone()[0]
+
+        self.request.user = factories.UserFactory(username="uploader")
+        self.handler.handle_raw_input(None, {}, 1024, b"boundary")
+        self.assertEqual(locked_slots(), 0)
+        self.handler.new_file("file", "talk.pdf", "application/pdf", None)
+        self.assertEqual(locked_slots(), 1)
+        self.handler.upload_complete()
+        self.assertEqual(locked_slots(), 0)
+
+
+@override_settings(CSRF_COOKIE_SECURE=False, SESSION_COOKIE_SECURE=False, MAX_UPLOAD_SIZE=1024,
+    DATA_UPLOAD_MAX_MEMORY_SIZE=4096)
+class UploadLimitForm(TestCase):
+    def setUp(self):
+        SubmissionDeadline.objects.create(name="Deadline", close_date=timezone.now() + timezone.timedelta(days=1))
+        self.user = User.objects.create_superuser("upload.limit", "upload@example.com", factories.USER_PASSWORD)
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(self.user)
+
+    def test_rejected_upload_shown_as_form_error(self):
+        response = self.client.get(reverse("submit"))
+        response = self.client.post(reverse("submit"), {
+            "csrfmiddlewaretoken": str(response.context["csrf_token"]),
+            "title": "Oversized Talk",
+            "contact_email": "upload@example.com",
+            "file": SimpleUploadedFile("talk.pdf", b"%PDF-1.4 " + b"x" * 8192),
+        })
+        # Rejected by the form rather than by CSRF protection, with the other fields still received
+        self.assertEqual(response.status_code, 200)
+        form = response.context["form"]
+        self.assertEqual(form.errors["file"], [UPLOAD_TOO_LARGE])
+        self.assertEqual(form.data["title"], "Oversized Talk")
@@ -0,0 +1,261 @@
+import io
+import time
+import uuid
+import zipfile
+import tempfile
+from unittest import mock
+
+from django.urls import reverse
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.contrib.auth.models import Group
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from . import factories
+from gambit.roles import PROGRAMME_COMMITTEE
+from gambit.downloads import signed_file_url
+
+
+@override_settings(CSRF_COOKIE_SECURE=False, SESSION_COOKIE_SECURE=False)
+class SubmissionObject(TestCase):
+    def setUp(self):
+        self.author = factories.UserFactory.create(username="views.author")
+        self.reviewer = factories.UserFactory.create(username="views.reviewer")
+        Group.objects.get_or_create(name=PROGRAMME_COMMITTEE)[0].user_set.add(self.reviewer)
+        self.submission = factories.SubmissionFactory.create(user=self.author)
+
+    def test_missing_submission_not_found(self):
+        self.client.force_login(self.reviewer)
+        missing = uuid.uuid4()
+        for name in ("submission", "update_submission", "download_submission", "new_review"):
+            response = self.client.get(reverse(name, args=[missing]))
+            self.assertEqual(response.status_code, 404, name)
+        self.assertEqual(self.client.get(reverse("update_review", args=[missing])).status_code, 404)
+
+    def test_submission_loaded_once(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse("submission", args=[self.submission.uuid]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["submission"], self.submission)
+        self.assertIs(response.context["view"].get_submission(), response.context["submission"])
+
+    def test_reviews_listed_without_query_per_review(self):
+        self.client.force_login(self.reviewer)
+        url = reverse("submission", args=[self.submission.uuid])
+        factories.SubmissionReviewFactory.create(submission=self.submission, user=self.reviewer)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as one_review:
+            self.client.get(url)
+        for index in range(3):
+            user = factories.UserFactory.create(username=f"views.reviewer{index!s}")
+            factories.SubmissionReviewFactory.create(submission=self.submission, user=user)
+        with CaptureQueriesContext(connection) as many_reviews:
+            response = self.client.get(url)
+        self.assertEqual(len(response.context["reviews"]), 4)
+        self.assertEqual(len(many_reviews), len(one_review))
+
+    def test_other_author_forbidden(self):
+        other = factories.UserFactory.create(username="views.other")
+        self.client.force_login(other)
+        response = self.client.get(reverse("submission", args=[self.submission.uuid]))
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(CSRF_COOKIE_SECURE=False, SESSION_COOKIE_SECURE=False)
+class ListSubmissionData(TestCase):
+    def setUp(self):
+        self.author = factories.UserFactory.create(username="list.author")
+        self.reviewer = factories.UserFactory.create(username="list.reviewer")
+        Group.objects.get_or_create(name=PROGRAMME_COMMITTEE)[0].user_set.add(self.reviewer)
+        self.submissions = [
+            factories.SubmissionFactory.create(user=self.author, title=f"Submission {i!s}") for i in range(5)
+        ]
+        factories.SubmissionReviewFactory.create(submission=self.submissions[0], user=self.reviewer)
+        self.url = reverse("list_submissions_data")
+
+    def get(self, **params):
+        params.setdefault("order[0][column]", "0")
+        params.setdefault("order[0][dir]", "asc")
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_forbidden_for_authors(self):
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_keyset_pages_match_offset_pages(self):
+        self.client.force_login(self.reviewer)
+        first = self.get(start=0, length=2)
+        self.assertEqual(first["recordsTotal"], 5)
+        self.assertEqual([row["title"] for row in first["data"]], ["Submission 0", "Submission 1"])
+        by_cursor = self.get(start=2, length=2, after=first["next"])
+        by_offset = self.get(start=2, length=2)
+        self.assertEqual(by_cursor["data"], by_offset["data"])
+        self.assertEqual([row["title"] for row in by_cursor["data"]], ["Submission 2", "Submission 3"])
+        last = self.get(start=4, length=2, after=by_cursor["next"])
+        self.assertEqual([row["title"] for row in last["data"]], ["Submission 4"])
+        self.assertIsNone(last["next"])
+
+    def test_search_and_reviewed_flags(self):
+        self.client.force_login(self.reviewer)
+        response = self.get(**{"search[value]": "submission 0"})
+        self.assertEqual(response["recordsFiltered"], 1)
+        self.assertEqual(response["recordsTotal"], 5)
+        self.assertTrue(response["data"][0]["reviewed"])
+        response = self.get(**{"search[value]": "submission 1"})
+        self.assertFalse(response["data"][0]["reviewed"])
+
+    def test_quotes_left_for_the_page_to_escape(self):
+        # The submission list builds its cells as DOM elements, so data is sent as plain text rather than HTML
+        title = "Talk' onmouseover='alert(1)"
+        factories.SubmissionFactory.create(user=self.author, title=title)
+        self.client.force_login(self.reviewer)
+        row = self.get(**{"search[value]": "onmouseover"})["data"][0]
+        self.assertEqual(row["title"], title)
+        response = self.client.get(reverse("list_submissions"))
+        self.assertNotContains(response, "escapeHtml(")
+        self.assertNotContains(response, "title='\" +")
+
+    def test_invalid_cursor_falls_back_to_offset(self):
+        self.client.force_login(self.reviewer)
+        response = self.get(start=1, length=1, after="not a cursor")
+        self.assertEqual([row["title"] for row in response["data"]], ["Submission 1"])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CSRF_COOKIE_SECURE=False, SESSION_COOKIE_SECURE=False)
+class SubmissionArchive(TestCase):
+    def setUp(self):
+        self.author = factories.UserFactory.create(username="archive.author")
+        self.reviewer = factories.UserFactory.create(username="archive.reviewer")
+        Group.objects.get_or_create(name=PROGRAMME_COMMITTEE)[0].user_set.add(self.reviewer)
+        self.submission = factories.SubmissionFactory.create(
+            user=self.author,
+            title="Archived",
+            file=SimpleUploadedFile("talk.pdf", b"%PDF-1.4 archived"),
+        )
+        factories.SubmissionFactory.create(user=self.author, title="No file")
+
+    def download(self, **params):
+        response = self.client.get(reverse("download_submissions"), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+    def test_archive_contains_files_and_manifest(self):
+        self.client.force_login(self.reviewer)
+        archive = self.download()
+        names = archive.namelist()
+        self.assertEqual(len(names), 2)
+        self.assertEqual(archive.read(names[0]), b"%PDF-1.4 archived")
+        self.assertEqual(archive.getinfo(names[0]).compress_type, zipfile.ZIP_STORED)
+        manifest = archive.read("manifest.csv").decode()
+        self.assertIn(self.submission.file_hash, manifest)
+        self.assertNotIn("No file", manifest)
+
+    def test_archive_of_selected_submissions(self):
+        self.client.force_login(self.reviewer)
+        archive = self.download(uuid=[uuid.uuid4()])
+        self.assertEqual(archive.namelist(), ["manifest.csv"])
+
+    def test_invalid_selection_rejected(self):
+        self.client.force_login(self.reviewer)
+        response = self.client.get(reverse("download_submissions"), {"uuid": "not-a-uuid"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_forbidden_for_authors(self):
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(reverse("download_submissions")).status_code, 403)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CSRF_COOKIE_SECURE=False, SESSION_COOKIE_SECURE=False,
+    SUBMISSION_DOWNLOAD_OFFLOAD="none")
+class SubmissionFileDownload(TestCase):
+    CONTENT = b"%PDF-1.4 " + bytes(range(256)) * 4
+
+    def setUp(self):
+        self.author = factories.UserFactory.create(username="download.author")
+        self.submission = factories.SubmissionFactory.create(
+            user=self.author,
+            file=SimpleUploadedFile("talk.pdf", self.CONTENT),
+        )
+        self.url = reverse("download_submission", args=[self.submission.uuid])
+        self.etag = f'"{self.submission.file_hash!s}"'
+        self.client.force_login(self.author)
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(b"".join(response.streaming_content), self.CONTENT)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=9-18")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 9-18/{len(self.CONTENT)!s}")
+        self.assertEqual(b"".join(response.streaming_content), self.CONTENT[9:19])
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-4")
+        self.assertEqual(b"".join(response.streaming_content), self.CONTENT[-4:])
+
+    def test_range_not_satisfiable(self):
+        response = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.CONTENT)!s}-")
+        self.assertEqual(response.status_code, 416)
+
+    def test_stale_if_range_serves_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SUBMISSION_DOWNLOAD_OFFLOAD="nginx", SUBMISSION_DOWNLOAD_INTERNAL_URL="/protected/media/")
+    def test_offload(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected/media/{self.submission.file.name!s}")
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(response.content, b"")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CSRF_COOKIE_SECURE=False, SESSION_COOKIE_SECURE=False,
+    SUBMISSION_DOWNLOAD_OFFLOAD="none", SUBMISSION_DOWNLOAD_SIGNING_KEY="signing-key", SUBMISSION_DOWNLOAD_URL_TTL=300)
+class SignedSubmissionFile(TestCase):
+    CONTENT = b"%PDF-1.4 signed"
+
+    def setUp(self):
+        self.author = factories.UserFactory.create(username="signed.author")
+        self.submission = factories.SubmissionFactory.create(
+            user=self.author,
+            file=SimpleUploadedFile("talk.pdf", self.CONTENT),
+        )
+        self.client.force_login(self.author)
+        response = self.client.get(reverse("submission", args=[self.submission.uuid]))
+        self.url = response.context["submission_file_url"]
+
+    def test_signed_url_served_without_queries(self):
+        self.client.logout()
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b"".join(response.streaming_content), self.CONTENT)
+        self.assertEqual(response["ETag"], f'"{self.submission.file_hash!s}"')
+        self.assertIn("talk.pdf", response["Content-Disposition"])
+
+    def test_tampered_url_forbidden(self):
+        response = self.client.get(self.url.replace("talk.pdf", "other.pdf"))
+        self.assertEqual(response.status_code, 403)
+
+    def file_url(self, now):
+        with mock.patch("gambit.downloads.time.time", return_value=now):
+            return signed_file_url(self.author, self.submission)
+
+    def test_url_stable_within_window(self):
+        start = 1000 * 300
+        self.assertEqual(self.file_url(start + 10), self.file_url(start + 290))
+        self.assertNotEqual(self.file_url(start + 290), self.file_url(start + 310))
+
+    def test_expired_url_redirects_to_checked_download(self):
+        url = self.file_url(time.time() - 3600)
+        response = self.client.get(url)
+        self.assertRedirects(response, reverse("download_submission", args=[self.submission.uuid]),
+            fetch_redirect_response=False)
@@ -0,0 +1,183 @@
+import hashlib
+import weakref
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.core.files.uploadhandler import (FileUploadHandler, MemoryFileUploadHandler, SkipFile,
+    TemporaryFileUploadHandler)
+
+
+# Number of leading bytes kept from each upload for content type detection
+SNIFF_LENGTH = 2048
+
+ZIP_CONTENT_TYPES = (
+    "application/zip",
+    "application/x-zip",
+    "application/x-zip-compressed",
+    "application/octet-stream",
+)
+
+# Magic bytes of the file formats accepted for submissions, mapped to every content type they may be uploaded as
+SIGNATURES = (
+    (b"%PDF-", ("application/pdf",)),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", ("application/msword", "application/vnd.ms-powerpoint")),
+    (b"PK\x03\x04", ZIP_CONTENT_TYPES),
+    (b"PK\x05\x06", ZIP_CONTENT_TYPES),
+)
+
+DOCX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def sniff_content_type(header, client_content_type=None):
+    """Return the whitelisted content type matching the magic bytes in header, or None if there is no match
+
+    The client-supplied content type is only used to choose between types that share a signature, e.g. doc and ppt.
+    """
+    for signature, content_types in SIGNATURES:
+        if header.startswith(signature):
+            # Office Open XML documents are zip archives whose first entries name the document parts
+            if content_types is ZIP_CONTENT_TYPES and b"word/" in header:
+                content_types = (DOCX_CONTENT_TYPE,) + content_types
+            allowed = [ct for ct in content_types if ct in settings.CONTENT_TYPES]
+            if client_content_type in allowed:
+                return client_content_type
+            return allowed[0] if allowed else None
+    return None
+
+
+def sniff_uploaded_file(file):
+    """Detect the content type of an uploaded file that did not pass through StreamingDigestMixin"""
+    sniffed_content_type = getattr(file, "sniffed_content_type", None)
+    if sniffed_content_type is None:
+        file.seek(0)
+        sniffed_content_type = sniff_content_type(file.read(SNIFF_LENGTH), getattr(file, "content_type", None))
+        file.seek(0)
+    return sniffed_content_type
+
+
+UPLOAD_TOO_LARGE = "Submitted file is too large. Please limit uploads to 50MiB."
+UPLOAD_LIMIT_REACHED = "Too many uploads are in progress. Please wait a moment and try again."
+
+# Uploads currently being received by this worker process
+_worker_uploads = threading.BoundedSemaphore(settings.MAX_CONCURRENT_UPLOADS_PER_WORKER)
+
+
+class UploadLimitHandler(FileUploadHandler):
+    """Rejects oversized or excess uploads before anything is spooled to memory or disk
+
+    Must be the first entry in FILE_UPLOAD_HANDLERS. A rejected upload leaves its reason in request.upload_error so
+    the view can render it as a form error. Only the files are skipped, so the form's other fields, including its CSRF
+    token, are still received. Upload slots are only taken once a file arrives, so forms posted without one are never
+    turned away.
+    """
+
+    slots_held = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Non-file form fields are bounded separately by DATA_UPLOAD_MAX_MEMORY_SIZE
+        if content_length > settings.MAX_UPLOAD_SIZE + settings.DATA_UPLOAD_MAX_MEMORY_SIZE:
+            self.reject(UPLOAD_TOO_LARGE)
+
+    def acquire_slots(self):
+        """Take an upload slot on this worker and one of the user's for the rest of the request, if both are free"""
+        if self.slots_held:
+            return True
+        if not _worker_uploads.acquire(blocking=False):
+            return False
+        user_slot = self.acquire_user_slot()
+        if user_slot is False:
+            _worker_uploads.release()
+            return False
+        self.slots_held = True
+        self.release = weakref.finalize(self.request, self.release_slots, user_slot)
+        return True
+
+    def acquire_user_slot(self):
+        """Lock one of the user's upload slots, returning its advisory lock key, or False if every slot is taken
+
+        The locks are held by the database session rather than a transaction, so they are shared by every worker and
+        are released by the database should a worker die mid-upload. The two key form of the lock functions does not
+        overlap the single keys taken by lock_submission_file.
+        """
+        user = getattr(self.request, "user", None)
+        if user is None or not user.is_authenticated:
+            return None
+        with connection.cursor() as cursor:
+            for slot in range(settings.MAX_CONCURRENT_UPLOADS_PER_USER):
+                cursor.execute("SELECT pg_try_advisory_lock(%s, %s)", [user.pk, slot])
+                if cursor.fetchone()[0]:
+                    return (user.pk, slot)
+        return False
+
+    @staticmethod
+    def release_slots(user_slot):
+        _worker_uploads.release()
+        # Closing a connection releases its advisory locks, so there is nothing to unlock once it has been closed
+        if user_slot is not None and connection.connection is not None:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s, %s)", list(user_slot))
+
+    def release(self):
+        # Replaced by a finalizer once upload slots have been acquired
+        pass
+
+    def reject(self, reason):
+        self.request.upload_error = reason
+
+    def new_file(self, *args, **kwargs):
+        super(UploadLimitHandler, self).new_file(*args, **kwargs)
+        if not getattr(self.request, "upload_error", None) and not self.acquire_slots():
+            self.reject(UPLOAD_LIMIT_REACHED)
+        # The rest of a skipped file is read and discarded without reaching the handlers which store it
+        if getattr(self.request, "upload_error", None):
+            raise SkipFile()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.MAX_UPLOAD_SIZE:
+            self.request.upload_error = UPLOAD_TOO_LARGE
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def upload_complete(self):
+        self.release()
+
+
+class StreamingDigestMixin:
+    """Hashes and sniffs an upload as its chunks arrive so the file never has to be read a second time
+
+    The resulting UploadedFile carries a hashes dict of hex digests and the detected sniffed_content_type.
+    """
+
+    def new_file(self, *args, **kwargs):
+        self.digests = {algorithm: hashlib.new(algorithm) for algorithm in settings.UPLOAD_HASH_ALGORITHMS}
+        self.header = b""
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        remaining = super().receive_data_chunk(raw_data, start)
+        # Only the handler which consumed the chunk records it, otherwise the chunk is passed on to the next handler
+        if remaining is None:
+            for digest in self.digests.values():
+                digest.update(raw_data)
+            if len(self.header) < SNIFF_LENGTH:
+                self.header += raw_data[:SNIFF_LENGTH - len(self.header)]
+        return remaining
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.hashes = {algorithm: digest.hexdigest() for algorithm, digest in self.digests.items()}
+            file.sniffed_content_type = sniff_content_type(self.header, self.content_type)
+        return file
+
+
+class DigestMemoryFileUploadHandler(StreamingDigestMixin, MemoryFileUploadHandler):
+    pass
+
+
+class DigestTemporaryFileUploadHandler(StreamingDigestMixin, TemporaryFileUploadHandler):
+    pass
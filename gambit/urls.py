@@ -25,7 +25,15 @@ urlpatterns = [
     path("account_activation_sent/", views.account_activation_sent, name="account_activation_sent",),
     path("submit/", views.submit_form_upload, name="submit",),
     path("submissions/", views.ListSubmission.as_view(), name="list_submissions",),
-
+    path("submissions/data/", views.ListSubmissionData.as_view(), name="list_submissions_data",),
+    path("scoreboard/", views.SubmissionScoreboard.as_view(), name="scoreboard",),
+    path("search/", views.SearchSubmission.as_view(), name="search",),
+
+    path("download/submissions/", views.SubmissionArchiveView.as_view(), name="download_submissions",),
+    path("download/signed/<uuid:uuid>/<path:name>",
+        views.signed_submission_file,
+        name="signed_download_submission",
+    ),
     path("download/submission/<uuid:pk>/",
         views.SubmissionFileView.as_view(),
         name="download_submission",
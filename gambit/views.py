@@ -1,25 +1,44 @@
+import json
+import binascii
+import mimetypes
+from base64 import urlsafe_b64encode, urlsafe_b64decode
 from datetime import datetime
 
 from django.urls import reverse
+from django.conf import settings
 from django.views import generic
+from django.db import transaction, IntegrityError
 from django.utils import timezone
 from django.contrib import messages
+from django.db.models import Q, Value
+from django.http import JsonResponse, HttpResponseBadRequest, FileResponse, Http404
+from django.db.models.functions import Coalesce
+from django.core import exceptions
+from django.core.exceptions import ValidationError
+from django.core.signing import BadSignature, SignatureExpired
 from django.contrib.auth.models import User
 from django.shortcuts import render_to_response
 from django_downloadview import ObjectDownloadView
-from django.template.loader import render_to_string
-from django.utils.encoding import force_text, force_bytes
+from django.utils.encoding import force_text
 from django.contrib.auth.decorators import login_required
 from django.contrib.sites.shortcuts import get_current_site
 from django.contrib.messages.views import SuccessMessageMixin
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, mixins, REDIRECT_FIELD_NAME
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-
+from django.utils.http import urlsafe_base64_decode
+
+from . import jobs, tasks
+from .roles import PROGRAMME_COMMITTEE
+from .search import search_submissions, format_headline
+from .archive import submission_archive_response
+from .storage import submission_storage, blob_hash
+from .downloads import (conditional_file_response, add_validators, file_etag, content_disposition, signed_file_url,
+    verify_signed_url)
+from .content import get_managed_content, get_managed_content_list
 from .tokens import account_activation_token
 from .forms import SignUpForm, SubmitForm, SubmissionReviewForm, FrontPageLoginForm, UpdateProfileForm
 from .models import (Submission, SubmissionReview, FrontPage, SubmissionDeadline, RegistrationStatus, HelpPageItem,
-    Profile)
+    Profile, SubmissionRanking)
 
 
 class Home(generic.edit.FormMixin, generic.TemplateView):
@@ -53,11 +72,7 @@ class Home(generic.edit.FormMixin, generic.TemplateView):
     def get_context_data(self, **kwargs):
         """Return front page content"""
         context = super(Home, self).get_context_data(**kwargs)
-        try:
-            front_page = FrontPage.objects.first()
-            context["front_page"] = front_page
-        except FrontPage.DoesNotExist:
-            context["front_page"] = None
+        context["front_page"] = get_managed_content(FrontPage)
         return context
 
 
@@ -71,9 +86,9 @@ class ViewProfile(mixins.LoginRequiredMixin, generic.TemplateView):
         user = self.request.user
         profile = user.profile
         context["submissions"] = profile.get_submissions()
-        is_pc = user.groups.filter(name="Programme Committee").exists()
+        is_pc = PROGRAMME_COMMITTEE in self.request.roles
         if is_pc:
-            context["reviews"] = profile.get_reviews()
+            context["reviews"] = profile.get_reviews().select_related("submission")
         return context
 
 
@@ -110,7 +125,21 @@ class UpdateProfile(SuccessMessageMixin, mixins.LoginRequiredMixin, generic.edit
         return reverse("profile")
 
 
-class ViewSubmission(mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, generic.TemplateView):
+class SubmissionObjectMixin:
+    """Loads the submission named in the URL once per request, for both the permission check and the response
+
+    A submission which does not exist raises Http404.
+    """
+    submission_url_kwarg = "uuid"
+
+    def get_submission(self):
+        if not hasattr(self, "_submission"):
+            uuid = self.kwargs.get(self.submission_url_kwarg)
+            self._submission = get_object_or_404(Submission.objects.select_related("user__profile"), uuid=uuid)
+        return self._submission
+
+
+class ViewSubmission(SubmissionObjectMixin, mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, generic.TemplateView):
     model = Submission
     template_name = "gambit/submission_view.html"
     login_url = "login"
@@ -118,81 +147,129 @@ class ViewSubmission(mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, gene
 
     def test_func(self):
         user = self.request.user
-        uuid = self.kwargs.get('uuid')  # from URL <uuid>
-        submission = Submission.objects.get(uuid=uuid)
-        submission_user_id = submission.user.id
+        submission = self.get_submission()
+        submission_user_id = submission.user_id
         is_su = user.is_superuser
-        is_pc = user.groups.filter(name="Programme Committee").exists()
+        is_pc = PROGRAMME_COMMITTEE in self.request.roles
         owns_submission = submission_user_id == user.id
         return is_su or is_pc or owns_submission
 
     def get_context_data(self, **kwargs):
         """Return submission data"""
         context = super(ViewSubmission, self).get_context_data(**kwargs)
-        uuid = self.kwargs["uuid"]
-        submission = get_object_or_404(Submission, uuid=uuid)
+        submission = self.get_submission()
         user = self.request.user
         context["submission"] = submission
         context["submission_file_name"] = submission.get_file_name()
-        context["reviews"] = submission.get_reviews()
+        if submission.file:
+            context["submission_file_url"] = signed_file_url(self.request.user, submission)
+        context["reviews"] = submission.get_reviews().select_related("user__profile")
         context["related_submissions"] = submission.get_related_submissions()
-        # If submission older than 3 months (typically longer than the period the CFP is open), deny editing
         # Prevents modification of submissions from previous years
-        submission_date = submission.submitted_on.date()
-        context["can_edit"] = (datetime.now().date() - submission_date).days < 90
-        has_reviewed = SubmissionReview.objects.filter(submission=submission, user=user).exists()
-        context["has_reviewed"] = has_reviewed
+        context["can_edit"] = submission.in_active_cycle()
+        # Return UUID for review edit button URL
+        review_uuid = SubmissionReview.objects.filter(submission=submission, user=user).values_list('uuid', flat=True).first()
+        context["has_reviewed"] = review_uuid is not None
         if context["has_reviewed"]:
-            review = SubmissionReview.objects.filter(submission=submission, user=user).first()
-            # Return UUID for review edit button URL
-            context["review_uuid"] = review.uuid
+            context["review_uuid"] = review_uuid
         return context
 
 
-class UpdateSubmission(SuccessMessageMixin, mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, generic.edit.UpdateView):
+class UpdateSubmission(SubmissionObjectMixin, SuccessMessageMixin, mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, generic.edit.UpdateView):
     model = Submission
     form_class = SubmitForm
     template_name_suffix = "_update"
     login_url = "login"
     redirect_field_name = "home"
     success_message = "Submission updated successfully"
+    submission_url_kwarg = "pk"
 
     # Is model owned by editor?
-    # Is the submission over 3 months old? If so, prevent edits.
+    # Is the submission from a previous CFP? If so, prevent edits.
     def test_func(self):
         user = self.request.user
-        uuid = self.kwargs.get('pk')
-        submission = Submission.objects.get(uuid=uuid)
-        submission_user_id = submission.user.id
-        submission_date = submission.submitted_on.date()
+        submission = self.get_submission()
+        submission_user_id = submission.user_id
         owns_submission = submission_user_id == user.id
-        can_edit = (datetime.now().date() - submission_date).days < 90
+        can_edit = submission.in_active_cycle()
         return owns_submission and can_edit
 
+    def get_form_kwargs(self):
+        kwargs = super(UpdateSubmission, self).get_form_kwargs()
+        kwargs["upload_error"] = getattr(self.request, "upload_error", None)
+        return kwargs
+
+    def get_object(self, queryset=None):
+        return self.get_submission()
+
     def get_success_url(self):
         uuid = self.object.uuid
         return reverse("submission", args=[uuid])
 
 
-class SubmissionFileView(mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, ObjectDownloadView):
+class SubmissionFileView(SubmissionObjectMixin, mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, ObjectDownloadView):
     login_url = "login"
     redirect_field_name = "home"
     attachment = False  # Display files inline if possible
+    submission_url_kwarg = "pk"
 
     def __init__(self):
         self.model = Submission
 
+    # Stored files are named after their hash, so serve them under the name they were uploaded with
+    def get_basename(self):
+        return self.object.get_file_name()
+
+    def get_object(self, queryset=None):
+        return self.get_submission()
+
+    # Conditional, partial and offloaded responses; otherwise the whole file is streamed by django-downloadview
+    def render_to_response(self, *args, **kwargs):
+        if self.object.file:
+            file = self.object.file
+            response = conditional_file_response(self.request, file.storage, file.name, self.object.file_hash,
+                self.get_basename(), self.attachment)
+            if response is not None:
+                return response
+        response = super(SubmissionFileView, self).render_to_response(*args, **kwargs)
+        return add_validators(response, file_etag(self.object.file_hash))
+
     def test_func(self):
         user = self.request.user
-        uuid = self.kwargs.get('pk')
-        submission = Submission.objects.get(uuid=uuid)
-        submission_user_id = submission.user.id
+        submission = self.get_submission()
+        submission_user_id = submission.user_id
         is_su = user.is_superuser
-        is_pc = user.groups.filter(name="Programme Committee").exists()
+        is_pc = PROGRAMME_COMMITTEE in self.request.roles
         owns_submission = submission_user_id == user.id
         return is_su or is_pc or owns_submission
 
 
+def signed_submission_file(request, uuid, name):
+    """Serve a submission file from a signed URL, which was authorised when it was issued
+
+    Neither the session nor the database is consulted, so this can run on servers separate from the application or be
+    replaced by a web server verifying the same signature.
+    """
+    try:
+        basename = verify_signed_url(uuid, name, request.GET)
+    except SignatureExpired:
+        # Pages can be left open for longer than links last, so send the user through the normal permission checks
+        return redirect("download_submission", uuid)
+    except BadSignature:
+        raise exceptions.PermissionDenied("Invalid download link")
+    response = conditional_file_response(request, submission_storage, name, blob_hash(name), basename, False)
+    if response is None:
+        try:
+            file = submission_storage.open(name, "rb")
+        except FileNotFoundError:
+            raise Http404("File not found")
+        content_type = mimetypes.guess_type(basename)[0] or "application/octet-stream"
+        response = FileResponse(file, content_type=content_type)
+        response["Content-Disposition"] = content_disposition(basename, False)
+        add_validators(response, file_etag(blob_hash(name)))
+    return response
+
+
 class ListSubmission(mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, generic.TemplateView):
     template_name = "gambit/submission_list.html"
     login_url = "login"
@@ -202,21 +279,213 @@ class ListSubmission(mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, gene
     def test_func(self):
         user = self.request.user
         is_su = user.is_superuser
-        is_pc = user.groups.filter(name="Programme Committee").exists()
+        is_pc = PROGRAMME_COMMITTEE in self.request.roles
         return is_su or is_pc
 
-    def get_context_data(self, **kwargs):
-        """Return all submissions"""
-        context = super(ListSubmission, self).get_context_data(**kwargs)
+
+def encode_cursor(value, uuid):
+    """Return a keyset cursor for the row whose sort value is value, with ties broken by the submission's uuid"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    cursor = json.dumps([value, str(uuid)]).encode()
+    return urlsafe_b64encode(cursor).decode()
+
+
+def decode_cursor(cursor, field):
+    """Return the (value, uuid) of a cursor, with value parsed by the model field sorted on, or None if it is invalid"""
+    try:
+        value, uuid = json.loads(urlsafe_b64decode(cursor.encode()))
+        return field.to_python(value), Submission._meta.pk.to_python(uuid)
+    except (binascii.Error, ValueError, TypeError, ValidationError):
+        return None
+
+
+class ListSubmissionData(mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, generic.View):
+    """DataTables server-side processing endpoint for the submission list of one CFP cycle
+
+    Pages following one already loaded are fetched with a keyset cursor (the "after" parameter, returned as "next" with
+    each page) so that deep pages cost the same as the first. Other pages fall back to an offset.
+    """
+    login_url = "login"
+    redirect_field_name = "home"
+    max_length = 100
+
+    # Sortable columns in table order, as (annotation, model field used to parse cursors). The reviewed column is not
+    # sortable as it differs for every reviewer.
+    columns = [
+        ("title", Submission._meta.get_field("title")),
+        None,
+        ("review_count", Submission._meta.get_field("review_count")),
+        ("average_score", Submission._meta.get_field("average_score")),
+        ("sort_name", Profile._meta.get_field("name")),
+        ("sort_country", Profile._meta.get_field("country")),
+        ("submitted_on", Submission._meta.get_field("submitted_on")),
+    ]
+
+    # Is the logged in user an admin or a member of the PC?
+    def test_func(self):
+        user = self.request.user
+        is_su = user.is_superuser
+        is_pc = PROGRAMME_COMMITTEE in self.request.roles
+        return is_su or is_pc
+
+    def get_int(self, name, default, minimum=0, maximum=None):
+        try:
+            value = max(int(self.request.GET.get(name, default)), minimum)
+        except ValueError:
+            value = default
+        return min(value, maximum) if maximum is not None else value
+
+    def get_ordering(self):
+        index = self.get_int("order[0][column]", 6, maximum=len(self.columns) - 1)
+        column = self.columns[index] or self.columns[6]
+        descending = self.request.GET.get("order[0][dir]", "desc") == "desc"
+        return column, descending
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        cycle = self.get_int("cycle", settings.CONFERENCE_YEAR)
+        start = self.get_int("start", 0)
+        length = self.get_int("length", 10, minimum=1, maximum=self.max_length)
+        search = request.GET.get("search[value]", "").strip()
+        (sort_field, cursor_field), descending = self.get_ordering()
+
+        # Profile names and countries are coalesced so that cursors never have to compare against NULL
+        submissions = Submission.objects.filter(cycle=cycle).annotate(
+            sort_name=Coalesce("user__profile__name", Value("")),
+            sort_country=Coalesce("user__profile__country", Value("")),
+        )
+        total = submissions.count()
+        if search:
+            submissions = submissions.filter(
+                Q(title__icontains=search) |
+                Q(user__profile__name__icontains=search) |
+                Q(user__profile__country__icontains=search)
+            )
+            filtered = submissions.count()
+        else:
+            filtered = total
+
+        # The primary key breaks ties so that every row has a unique position for the cursor
+        if descending:
+            submissions = submissions.order_by(f"-{sort_field!s}", "-uuid")
+        else:
+            submissions = submissions.order_by(sort_field, "uuid")
+        cursor = decode_cursor(request.GET["after"], cursor_field) if request.GET.get("after") else None
+        if cursor is not None:
+            value, uuid = cursor
+            after = "lt" if descending else "gt"
+            submissions = submissions.filter(
+                Q(**{f"{sort_field!s}__{after!s}": value}) |
+                Q(**{sort_field: value, f"uuid__{after!s}": uuid})
+            )
+        else:
+            submissions = submissions[start:]
+
+        fields = ['uuid', 'user_id', 'title', 'review_count', 'average_score', 'sort_name', 'sort_country', 'submitted_on']
+        rows = list(submissions.values(*fields)[:length])
+        # Only the reviews of the rows on this page are fetched, as a set for constant time lookups
+        reviewed = set(SubmissionReview.objects.filter(
+            user=user,
+            submission__in=[row["uuid"] for row in rows],
+        ).values_list('submission', flat=True))
+
+        data = [
+            {
+                "url": reverse("submission", args=[row["uuid"]]),
+                "title": row["title"],
+                "reviewed": row["uuid"] in reviewed,
+                "review_count": row["review_count"],
+                "average_score": row["average_score"],
+                "name": row["sort_name"],
+                "country": row["sort_country"],
+                "submitted_on": timezone.localtime(row["submitted_on"]).strftime("%Y-%m-%d"),
+                "own": row["user_id"] == user.id,
+            }
+            for row in rows
+        ]
+        last = rows[-1] if len(rows) == length else None
+        return JsonResponse({
+            "draw": self.get_int("draw", 0),
+            "recordsTotal": total,
+            "recordsFiltered": filtered,
+            "data": data,
+            "next": encode_cursor(last[sort_field], last["uuid"]) if last else None,
+        })
+
+
+class SubmissionArchiveView(mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, generic.View):
+    """Streams a ZIP of the files of the submissions given by uuid, or of every submission in a CFP cycle"""
+    login_url = "login"
+    redirect_field_name = "home"
+
+    # Is the logged in user an admin or a member of the PC?
+    def test_func(self):
         user = self.request.user
-        submissions = Submission.objects.all().values('uuid', 'user__profile__name', 'title', 'review_count', 'average_score', 'user__profile__country', 'submitted_on')
-        context["submissions"] = submissions
-        has_reviewed_list = SubmissionReview.objects.filter(user=user).values_list('submission', flat=True)
-        context["reviewed"] = has_reviewed_list
+        is_su = user.is_superuser
+        is_pc = PROGRAMME_COMMITTEE in self.request.roles
+        return is_su or is_pc
+
+    def get(self, request, *args, **kwargs):
+        uuids = request.GET.getlist("uuid")
+        try:
+            if uuids:
+                submissions = Submission.objects.filter(uuid__in=uuids)
+            elif "cycle" in request.GET:
+                submissions = Submission.objects.filter(cycle=int(request.GET["cycle"]))
+            else:
+                submissions = Submission.objects.active()
+            # Evaluated here so that malformed UUIDs are rejected before the response starts streaming
+            submissions.exists()
+        except (ValueError, ValidationError):
+            return HttpResponseBadRequest("Invalid submission or cycle")
+        return submission_archive_response(submissions)
+
+
+class SubmissionScoreboard(mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, generic.TemplateView):
+    template_name = "gambit/submission_scoreboard.html"
+    login_url = "login"
+    redirect_field_name = "home"
+    page_size = 100
+
+    # Is the logged in user an admin or a member of the PC?
+    def test_func(self):
+        user = self.request.user
+        is_su = user.is_superuser
+        is_pc = PROGRAMME_COMMITTEE in self.request.roles
+        return is_su or is_pc
+
+    def get_context_data(self, **kwargs):
+        """Return a page of ranked submissions for the conference year, with a cursor for the next page if there is one"""
+        context = super(SubmissionScoreboard, self).get_context_data(**kwargs)
+        # Tied submissions share a rank, so their uuids give every row a unique position for the cursor
+        rankings = SubmissionRanking.objects.filter(year=settings.CONFERENCE_YEAR).order_by("rank", "submission_id")
+        after = self.request.GET.get("after")
+        cursor = decode_cursor(after, SubmissionRanking._meta.get_field("rank")) if after else None
+        if cursor is not None:
+            rank, uuid = cursor
+            rankings = rankings.filter(Q(rank__gt=rank) | Q(rank=rank, submission_id__gt=uuid))
+        rankings = list(rankings.values(
+            'submission__uuid',
+            'submission__title',
+            'submission__user__profile__name',
+            'review_count',
+            'average_score',
+            'average_expertise_score',
+            'weighted_score',
+            'submission__calibration__calibrated_score',
+            'rank',
+            'percentile',
+        )[:self.page_size + 1])
+        context["rankings"] = rankings[:self.page_size]
+        context["paginated"] = cursor is not None
+        if len(rankings) > self.page_size:
+            last = rankings[self.page_size - 1]
+            context["next"] = encode_cursor(last["rank"], last["submission__uuid"])
         return context
 
 
-class CreateReview(SuccessMessageMixin, mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, generic.edit.CreateView):
+class CreateReview(SubmissionObjectMixin, SuccessMessageMixin, mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, generic.edit.CreateView):
     model = SubmissionReview
     form_class = SubmissionReviewForm
     template_name_suffix = "_create_or_update"
@@ -226,34 +495,38 @@ class CreateReview(SuccessMessageMixin, mixins.LoginRequiredMixin, mixins.UserPa
 
     # Is the logged in user an admin or a member of the PC?
     # Is there an existing review from this user for this submission?
-    # Is the submission over 5 months old? If so, prevent edits.
+    # Is the submission from a previous CFP? If so, prevent reviews.
     def test_func(self):
         user = self.request.user
-        uuid = self.kwargs.get('uuid')
-        submission = Submission.objects.get(uuid=uuid)
-        submission_user_id = submission.user.id
-        submission_date = submission.submitted_on.date()
-        can_review = (datetime.now().date() - submission_date).days < 150
+        submission = self.get_submission()
+        can_review = submission.in_active_cycle()
         is_su = user.is_superuser
-        is_pc = user.groups.filter(name="Programme Committee").exists()
+        is_pc = PROGRAMME_COMMITTEE in self.request.roles
         has_reviewed = submission.has_reviewed(user.id)
         return is_su or is_pc and can_review and not has_reviewed
 
     def get_context_data(self, **kwargs):
         """Return submission data"""
         context = super(CreateReview, self).get_context_data(**kwargs)
-        uuid = self.kwargs["uuid"]
-        submission = get_object_or_404(Submission, uuid=uuid)
+        submission = self.get_submission()
         context["submission"] = submission
         context["submission_file_name"] = submission.get_file_name()
+        if submission.file:
+            context["submission_file_url"] = signed_file_url(self.request.user, submission)
         return context
 
     def form_valid(self, form):
         review = form.save(commit=False)
         uuid = self.kwargs["uuid"]
-        review.submission = get_object_or_404(Submission, uuid=uuid)
+        review.submission = self.get_submission()
         review.user = self.request.user
-        return super(CreateReview, self).form_valid(form)
+        # A second review from the same user (e.g. a double-submitted form) is refused by the unique constraint
+        try:
+            with transaction.atomic():
+                return super(CreateReview, self).form_valid(form)
+        except IntegrityError:
+            messages.error(self.request, "You have already reviewed this submission")
+            return redirect(reverse("submission", args=[uuid]))
 
     def get_success_url(self):
         uuid = self.kwargs["uuid"]
@@ -269,16 +542,15 @@ class UpdateReview(SuccessMessageMixin, mixins.LoginRequiredMixin, mixins.UserPa
     success_message = "Review has been updated"
 
     # Is the logged in user an admin or a member of the PC?
-    # Is the review over 5 months old? If so, prevent edits.
+    # Is the review from a previous CFP? If so, prevent edits.
     def test_func(self):
         user = self.request.user
         uuid = self.kwargs.get('pk')
-        review = SubmissionReview.objects.get(uuid=uuid)
-        review_id = review.user.id
-        review_date = review.submitted_on.date()
-        can_review = (datetime.now().date() - review_date).days < 150
+        review = get_object_or_404(SubmissionReview, uuid=uuid)
+        review_id = review.user_id
+        can_review = review.cycle == settings.CONFERENCE_YEAR
         is_su = user.is_superuser
-        is_pc = user.groups.filter(name="Programme Committee").exists()
+        is_pc = PROGRAMME_COMMITTEE in self.request.roles
         owns_review = review_id == user.id
         return is_su or is_pc and owns_review and can_review
 
@@ -289,6 +561,8 @@ class UpdateReview(SuccessMessageMixin, mixins.LoginRequiredMixin, mixins.UserPa
         submission = get_object_or_404(Submission, uuid=uuid)
         context["submission"] = submission
         context["submission_file_name"] = submission.get_file_name()
+        if submission.file:
+            context["submission_file_url"] = signed_file_url(self.request.user, submission)
         return context
 
     def get_success_url(self):
@@ -296,6 +570,43 @@ class UpdateReview(SuccessMessageMixin, mixins.LoginRequiredMixin, mixins.UserPa
         return reverse("submission", args=[uuid])
 
 
+class SearchSubmission(mixins.LoginRequiredMixin, mixins.UserPassesTestMixin, generic.TemplateView):
+    template_name = "gambit/submission_search.html"
+    login_url = "login"
+    redirect_field_name = "home"
+    max_results = 50
+
+    # Is the logged in user an admin or a member of the PC?
+    def test_func(self):
+        user = self.request.user
+        is_su = user.is_superuser
+        is_pc = PROGRAMME_COMMITTEE in self.request.roles
+        return is_su or is_pc
+
+    def get_context_data(self, **kwargs):
+        """Return the best matching submissions from every CFP, with the matching words highlighted"""
+        context = super(SearchSubmission, self).get_context_data(**kwargs)
+        query = self.request.GET.get("q", "").strip()
+        context["query"] = query
+        if query:
+            submissions = search_submissions(query).values(
+                'uuid',
+                'title_headline',
+                'abstract_headline',
+                'user__profile__name',
+                'submitted_on',
+                'rank',
+            )[:self.max_results]
+            context["results"] = [
+                dict(submission,
+                    title_headline=format_headline(submission["title_headline"]),
+                    abstract_headline=format_headline(submission["abstract_headline"]),
+                )
+                for submission in submissions
+            ]
+        return context
+
+
 class Help(mixins.LoginRequiredMixin, generic.TemplateView):
     template_name = "gambit/help.html"
     login_url = "login"
@@ -303,13 +614,13 @@ class Help(mixins.LoginRequiredMixin, generic.TemplateView):
     def get_context_data(self, **kwargs):
         """Return help page content"""
         context = super(Help, self).get_context_data(**kwargs)
-        help_page_items = HelpPageItem.objects.all()
+        help_page_items = get_managed_content_list(HelpPageItem)
         context["help_page_items"] = help_page_items
         return context
 
 
 def signup(request):
-    registration_status = RegistrationStatus.objects.first()
+    registration_status = get_managed_content(RegistrationStatus)
     if not registration_status.disabled:
         if request.method == "POST":
             form = SignUpForm(request.POST)
@@ -322,16 +633,8 @@ def signup(request):
                 user.is_active = False
                 user.save()
                 current_site = get_current_site(request)
-                subject = "[44CON] Activate your 44CON CFP account"
-                message = render_to_string("gambit/account_activation_email.html",
-                    {
-                        "user": user,
-                        "domain": current_site.domain,
-                        "uid": urlsafe_base64_encode(force_bytes(user.pk)).decode(),
-                        "token": account_activation_token.make_token(user),
-                    }
-                )
-                user.email_user(subject, message)
+                # Sent by a job worker so that signing up does not wait on the mail provider
+                jobs.enqueue(tasks.send_activation_email, user_id=user.id, domain=current_site.domain)
                 return redirect("account_activation_sent")
         else:
             form = SignUpForm()
@@ -370,7 +673,7 @@ def account_activation_sent(request):
 def submit_form_upload(request):
     # Prevent submissions after deadline has passed
     try:
-        deadline = SubmissionDeadline.objects.first()
+        deadline = get_managed_content(SubmissionDeadline)
         open_date = deadline.open_date
         close_date = deadline.close_date
     except AttributeError as e:
@@ -382,7 +685,7 @@ def submit_form_upload(request):
     
     if (current_time >= open_date and current_time <= close_date) or user_is_su:
         if request.method == "POST":
-            form = SubmitForm(request.POST, request.FILES)
+            form = SubmitForm(request.POST, request.FILES, upload_error=getattr(request, "upload_error", None))
             if form.is_valid():
                 # Associates the submission with the logged in user. There may be a more "elegant" way to achieve this
                 # but this works and is robust. Submissions can only be made by logged in users which ensures the